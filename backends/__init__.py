@@ -0,0 +1,26 @@
+"""Fetch backends, one module per way of getting a site's content.
+
+A backend module is only imported when a configured site uses it, so an RSS-only
+deployment never loads Selenium. Each module defines a `Backend` class with
+`from_settings(settings)`, `fetch(site)` (a parse-stage payload, NOT_MODIFIED or None)
+and `close()`. To add one, write the module and list it in BACKEND_MODULES.
+"""
+import importlib
+
+from log_setup import get_logger
+
+# backend name -> module defining it
+BACKEND_MODULES = {
+    'rss': 'backends.rss',
+    'http': 'backends.http',
+    'selenium': 'backends.selenium',
+}
+
+
+def load_backend(name):
+    """Imports the module of backend `name` and returns its Backend class."""
+    return importlib.import_module(BACKEND_MODULES[name]).Backend
+
+
+def log(text, **fields):
+    get_logger().info(text, extra={'fields': fields})
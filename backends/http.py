@@ -0,0 +1,40 @@
+import requests
+
+from backends import log
+from http_cache import NOT_MODIFIED
+
+
+def response_payload(response):
+    """Raw body plus the bits of a response the parse stage needs; cheap to send to a worker process."""
+    headers = {key.lower(): value for key, value in response.headers.items()}
+    headers['content-location'] = response.url # Base for relative links
+    return {'body': response.content, 'headers': headers, 'url': response.url}
+
+
+class Backend:
+    """Plain HTTP GET of a page, through the shared conditional-GET cache."""
+
+    def __init__(self, http_cache):
+        self.http_cache = http_cache
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings['http_cache'])
+
+    def fetch_url(self, url):
+        """Fetches the raw HTML of a given URL as a payload for the parse stage."""
+        try:
+            # Conditional GET through the shared session (sends a browser User-Agent)
+            response = self.http_cache.get(url, timeout=10)
+        except requests.exceptions.RequestException as e:
+            log(f"Error fetching {url}: {e}", url=url)
+            return None
+        if response is NOT_MODIFIED:
+            return NOT_MODIFIED
+        return response_payload(response)
+
+    def fetch(self, site):
+        return self.fetch_url(site.url)
+
+    def close(self):
+        pass # The HTTP cache is shared and closed by its owner
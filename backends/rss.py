@@ -0,0 +1,9 @@
+from backends import http, log
+
+
+class Backend(http.Backend):
+    """Downloads a feed through the HTTP cache so unchanged feeds are never parsed again."""
+
+    def fetch_url(self, url):
+        log(f"Fetching feed from: {url}")
+        return super().fetch_url(url)
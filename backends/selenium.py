@@ -0,0 +1,102 @@
+import time
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options # Or Firefox options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from backends import log
+from browser_pool import BrowserPool
+from metrics import METRICS
+
+
+def create_chrome_driver():
+    """Launches a headless Chrome instance for the browser pool."""
+    # Setup Chrome options (headless recommended for background execution)
+    chrome_options = Options()
+    chrome_options.add_argument("--headless") # Run without opening a browser window
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36") # Set user agent
+
+    # Initialize WebDriver (assuming chromedriver is in PATH)
+    # If not in PATH, use: driver = webdriver.Chrome(service=service, options=chrome_options)
+    driver = webdriver.Chrome(options=chrome_options)
+    driver.implicitly_wait(5) # Basic implicit wait
+    return driver
+
+
+class Backend:
+    """Renders JavaScript-heavy pages in pooled headless Chrome instances."""
+
+    def __init__(self, pool_size=2, max_pages=50, wait_timeout=25):
+        # Browsers are started lazily (or by prewarm()) and reused across fetches
+        self.pool = BrowserPool(create_chrome_driver, size=pool_size, max_pages=max_pages)
+        self.wait_timeout = wait_timeout
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings['browser_pool_size'], settings['browser_max_pages'])
+
+    def prewarm(self):
+        self.pool.prewarm()
+
+    def fetch_html(self, url, site_name, wait_selector_str):
+        """Fetches dynamically loaded HTML content from a given URL using a pooled Selenium browser."""
+        html_content = None # Initialize html_content
+        timed_out = False
+        wait_selector = (By.CSS_SELECTOR, wait_selector_str) # Wait for any link inside the likely container
+        try:
+            with self.pool.driver() as driver:
+                log(f"Loading URL with Selenium: {url}", site=site_name)
+                driver.get(url)
+
+                log(f"Waiting up to {self.wait_timeout}s for element '{wait_selector_str}' to load...", site=site_name)
+                wait_started = time.perf_counter()
+                try:
+                    WebDriverWait(driver, self.wait_timeout).until(
+                        EC.presence_of_element_located(wait_selector)
+                        # Alternative: Wait for visibility if presence isn't enough
+                        # EC.visibility_of_element_located(wait_selector)
+                    )
+                    log("Element found, page likely loaded.", site=site_name)
+
+                    # Optional: Add a small extra sleep just in case more JS needs to run
+                    time.sleep(5)
+                except TimeoutException:
+                    log(f"Error: Timed out waiting for element '{wait_selector_str}' on {url}. Page might not have loaded correctly or selector is wrong.", site=site_name)
+                    timed_out = True
+                METRICS.observe('selenium_wait_seconds', time.perf_counter() - wait_started, site=site_name)
+
+                # Get the page source *after* JavaScript has potentially run
+                # (read it before the driver goes back to the pool and gets reset)
+                html_content = driver.page_source
+        except WebDriverException as e:
+            log(f"Error during Selenium fetch for {url}: {e}", site=site_name)
+            return None
+        except Exception as e:
+            log(f"An unexpected error occurred during Selenium fetch for {url}: {e}", site=site_name)
+            return None
+
+        if timed_out:
+            log("The page source (on timeout) is kept in the snapshot store - PLEASE INSPECT IT.", site=site_name)
+        else:
+            log(f"Successfully fetched HTML for {url}", site=site_name)
+
+        return html_content # Potentially incomplete HTML on timeout
+
+    def fetch(self, site):
+        """Selenium fetch wrapped as a parse-stage payload (page source re-encoded as UTF-8 bytes)."""
+        html_content = self.fetch_html(site.url, site.name, site.wait_selector)
+        if html_content is None:
+            return None
+        return {'body': html_content.encode('utf-8'), 'headers': {'content-type': 'text/html; charset=utf-8', 'content-location': site.url}, 'url': site.url}
+
+    def stats(self):
+        return self.pool.stats()
+
+    def close(self):
+        self.pool.close()
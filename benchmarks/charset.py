@@ -0,0 +1,64 @@
+"""Compares full-document charset detection (what requests does for response.text) against CharsetResolver.
+
+Builds CJK and Latin pages of the given size in several encodings, without any charset
+declaration, and times detecting each one over the whole body versus the resolver's
+bounded-prefix detection and its per-site cache.
+
+Usage: python -m benchmarks.charset [--kb N] [--repeat N]
+"""
+import argparse
+import timeit
+
+from charset_normalizer import from_bytes
+
+from charset import CharsetResolver
+
+PARAGRAPHS = {
+    'zh': '<p>鹰兹汽车科技（上海）有限公司今天发布了新的车型，星辉集团表示将扩大在海南的生产。</p>',
+    'zh-hant': '<p>星輝集團今天發布了新的車型，公司表示將擴大在海南的生產。</p>',
+    'en': '<p>Hertz and Subaru announced a new partnership today, Hyundai is expected to follow soon.</p>',
+}
+
+# (label, language, encoding)
+FIXTURES = [
+    ('zh gbk', 'zh', 'gbk'),
+    ('zh utf-8', 'zh', 'utf-8'),
+    ('zh big5', 'zh-hant', 'big5'),
+    ('en utf-8', 'en', 'utf-8'),
+]
+
+
+def build_page(language, encoding, size_kb):
+    paragraph = PARAGRAPHS[language]
+    count = max(size_kb * 1024 // len(paragraph.encode(encoding)), 1)
+    return f"<html><head><title>{paragraph[3:20]}</title></head><body>{paragraph * count}</body></html>".encode(encoding)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--kb', type=int, default=800, help='page size in KB')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for label, language, encoding in FIXTURES:
+        body = build_page(language, encoding, args.kb)
+        full_charset = from_bytes(body).best().encoding
+        full = min(timeit.repeat(lambda: from_bytes(body).best(), number=1, repeat=args.repeat))
+
+        def first_fetch():
+            return CharsetResolver().resolve('site', body, {})
+        charset, _ = first_fetch()
+        first = min(timeit.repeat(first_fetch, number=1, repeat=args.repeat))
+
+        resolver = CharsetResolver()
+        resolver.resolve('site', body, {})
+        cached = min(timeit.repeat(lambda: resolver.resolve('site', body, {}), number=1, repeat=args.repeat))
+
+        # Compare the decoded text, not the labels: ASCII-only pages decode the same as UTF-8
+        agrees = 'same text' if body.decode(full_charset) == body.decode(charset) else f"differs from {full_charset}"
+        print(f"{label:9} {len(body) / 1024:6.0f} KB  full document {full * 1000:8.1f} ms  "
+              f"resolver {first * 1000:6.1f} ms, cached {cached * 1000:6.2f} ms  -> {charset} [{agrees}]")
+
+
+if __name__ == '__main__':
+    main()
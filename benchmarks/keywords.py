@@ -0,0 +1,80 @@
+"""Compares the original per-keyword check_keywords loop against KeywordMatcher.
+
+Usage: python -m benchmarks.keywords [--articles N] [--keywords N] [--repeat N]
+"""
+import argparse
+import json
+import random
+import string
+import timeit
+
+from matcher import KeywordMatcher
+
+
+def legacy_check_keywords(articles, keywords):
+    """The check_keywords implementation before KeywordMatcher, kept as the baseline."""
+    relevant_articles = {}
+    for headline, item in articles.items():
+        link = item[0]
+        description = item[1]
+        matched_keywords = [keyword for keyword in keywords
+                    if keyword.lower() in headline.lower() or keyword.lower() in description.lower()]
+        if matched_keywords:
+           relevant_articles[headline] = [link,matched_keywords,description]
+    return relevant_articles
+
+
+def matcher_check_keywords(articles, matcher):
+    relevant_articles = {}
+    for headline, item in articles.items():
+        matched_keywords = matcher.match(headline, item[1])
+        if matched_keywords:
+            relevant_articles[headline] = [item[0],matched_keywords,item[1]]
+    return relevant_articles
+
+
+def random_words(rng, count):
+    return ' '.join(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(count))
+
+
+def build_articles(rng, keywords, count):
+    """Synthetic headlines/descriptions with a keyword planted in roughly one article in ten."""
+    articles = {}
+    for i in range(count):
+        headline = f"{random_words(rng, 10)} {i}"
+        description = random_words(rng, 40)
+        if rng.random() < 0.1:
+            description += ' ' + rng.choice(keywords).upper()
+        articles[headline] = [f"https://example.com/{i}", description]
+    return articles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--keywords', type=int, default=200, help='total keywords, padded with synthetic ones')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with open('config.json', 'r', encoding='utf-8') as f:
+        keywords = json.load(f)['keywords']
+    keywords = keywords + [random_words(rng, 1).capitalize() for _ in range(max(args.keywords - len(keywords), 0))]
+    articles = build_articles(rng, keywords, args.articles)
+
+    build_time = timeit.timeit(lambda: KeywordMatcher(keywords), number=1)
+    matcher = KeywordMatcher(keywords)
+    assert legacy_check_keywords(articles, keywords) == matcher_check_keywords(articles, matcher)
+
+    legacy = min(timeit.repeat(lambda: legacy_check_keywords(articles, keywords), number=1, repeat=args.repeat))
+    compiled = min(timeit.repeat(lambda: matcher_check_keywords(articles, matcher), number=1, repeat=args.repeat))
+
+    print(f"{len(articles)} articles x {len(keywords)} keywords")
+    print(f"  matcher build:    {build_time * 1000:8.2f} ms (once per config load)")
+    print(f"  legacy loop:      {legacy * 1000:8.2f} ms  ({len(articles) / legacy:,.0f} articles/s)")
+    print(f"  KeywordMatcher:   {compiled * 1000:8.2f} ms  ({len(articles) / compiled:,.0f} articles/s)")
+    print(f"  speedup:          {legacy / compiled:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
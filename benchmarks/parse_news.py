@@ -0,0 +1,70 @@
+"""Compares the original full-tree BeautifulSoup parse_news against the streaming extractor.
+
+Uses the saved Automotive News page (test2.txt) as the fixture.
+Usage: python -m benchmarks.parse_news [--fixture PATH] [--repeat N]
+"""
+import argparse
+import contextlib
+import io
+import timeit
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+import main as monitor
+
+BASE_URL = 'https://www.autonews.com/'
+
+# (soup_selector_ele, soup_selector_identifier) pairs to time; the first is the one used in config.json
+SELECTORS = [
+    ('a', {'data-testid': 'header-story-title'}),
+    ('a', {}),
+    ('a', {'class': 'u-font-secondary'}),
+    ('li', {'data-testid': 'list-item'}),
+]
+
+
+def legacy_parse_news(html_content, base_url, soup_ele, soup_identifier):
+    """parse_news before the streaming extractor: full BeautifulSoup tree, then find_all()."""
+    found_articles = {}
+    soup = BeautifulSoup(html_content, 'lxml')
+    for link_tag in soup.find_all(soup_ele, soup_identifier):
+        headline_text = link_tag.get_text(strip=True)
+        if headline_text and link_tag.has_attr('href'):
+            link_href = link_tag['href']
+            if link_href.startswith('/'):
+                link_href = urljoin(base_url, link_href)
+            if link_href.startswith(('http://', 'https://')) and headline_text not in found_articles:
+                found_articles[headline_text] = [link_href, '']
+    return found_articles
+
+
+def quiet_parse_news(*args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return monitor.parse_news(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--fixture', default='test2.txt')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with open(args.fixture, 'r', encoding='utf-8') as f:
+        html = f.read()
+    print(f"Fixture {args.fixture}: {len(html.encode('utf-8')) / 1024:.0f} KB")
+
+    for ele, identifier in SELECTORS:
+        expected = legacy_parse_news(html, BASE_URL, ele, identifier)
+        actual = quiet_parse_news(html, BASE_URL, ele, identifier)
+        assert expected == actual, f"Output differs for selector {ele} {identifier}"
+
+        legacy = min(timeit.repeat(lambda: legacy_parse_news(html, BASE_URL, ele, identifier), number=1, repeat=args.repeat))
+        streaming = min(timeit.repeat(lambda: quiet_parse_news(html, BASE_URL, ele, identifier), number=1, repeat=args.repeat))
+        print(f"{ele} {identifier}: {len(actual)} articles")
+        print(f"  BeautifulSoup tree: {legacy * 1000:7.2f} ms")
+        print(f"  streaming extract:  {streaming * 1000:7.2f} ms  ({legacy / streaming:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Replays article arrival timelines against fixed and adaptive polling to compare fetch count and detection latency.
+
+Timelines are synthetic by default; pass --timeline FILE with {"site": [arrival offsets in seconds], ...}
+to replay recorded ones (e.g. published timestamps collected from real feeds).
+Usage: python -m benchmarks.polling [--days N] [--timeline FILE] [--fixed-interval S]
+"""
+import argparse
+import bisect
+import json
+import random
+
+from pipeline import percentile
+from polling import PollScheduler
+
+
+def poisson_arrivals(rng, per_hour, start, end):
+    arrivals = []
+    now = start
+    while per_hour > 0:
+        now += rng.expovariate(per_hour / 3600)
+        if now >= end:
+            break
+        arrivals.append(now)
+    return arrivals
+
+
+def synthetic_timelines(days, seed=7):
+    """A mix of sources like the ones in config.json: an aggregator, steady and quiet sites."""
+    rng = random.Random(seed)
+    horizon = days * 86400
+    timelines = {
+        'aggregator (~20/h)': poisson_arrivals(rng, 20, 0, horizon),
+        'news site (~1/h)': poisson_arrivals(rng, 1, 0, horizon),
+        'quiet site (~1/day)': poisson_arrivals(rng, 1 / 24, 0, horizon),
+        'static page': [],
+    }
+    # Daytime-only publisher: 4/h for 10 hours a day, silent overnight
+    daytime = []
+    for day in range(days):
+        daytime += poisson_arrivals(rng, 4, day * 86400 + 8 * 3600, day * 86400 + 18 * 3600)
+    timelines['daytime publisher'] = daytime
+    return timelines
+
+
+def replay(timelines, horizon, scheduler):
+    """Polls every site as told by `scheduler` and measures how late each arrival is seen."""
+    for site in timelines:
+        scheduler.add(site, 0.0)
+    last_poll = {}
+    fetches = {site: 0 for site in timelines}
+    latencies = {site: [] for site in timelines}
+    while scheduler.next_due() is not None and scheduler.next_due() <= horizon:
+        now = scheduler.next_due()
+        for site in scheduler.pop_due(now):
+            arrivals = timelines[site]
+            since = last_poll.get(site)
+            low = bisect.bisect_right(arrivals, since) if since is not None else 0
+            high = bisect.bisect_right(arrivals, now)
+            # Everything published before the first poll counts as backlog, not as detection delay
+            if since is not None:
+                latencies[site].extend(now - arrival for arrival in arrivals[low:high])
+            fetches[site] += 1
+            scheduler.record(site, now, high - low if since is not None else None)
+            last_poll[site] = now
+    return fetches, latencies
+
+
+def report(name, fetches, latencies):
+    all_latencies = [value for values in latencies.values() for value in values]
+    print(f"\n{name}: {sum(fetches.values())} fetches, "
+          f"latency p50 {percentile(all_latencies, 0.5) / 60:.1f} min, p95 {percentile(all_latencies, 0.95) / 60:.1f} min")
+    for site in fetches:
+        values = latencies[site]
+        print(f"  {site:24} {fetches[site]:5} fetches  "
+              f"p50 {percentile(values, 0.5) / 60:6.1f} min  p95 {percentile(values, 0.95) / 60:6.1f} min  ({len(values)} articles)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--timeline', help='JSON file of recorded arrival offsets per site')
+    parser.add_argument('--fixed-interval', type=int, default=3600, help='interval of the fixed sweep to compare against')
+    parser.add_argument('--min-interval', type=int, default=300)
+    parser.add_argument('--max-interval', type=int, default=6 * 3600)
+    args = parser.parse_args()
+
+    if args.timeline:
+        with open(args.timeline, 'r', encoding='utf-8') as f:
+            timelines = {site: sorted(arrivals) for site, arrivals in json.load(f).items()}
+        horizon = max((arrivals[-1] for arrivals in timelines.values() if arrivals), default=0)
+    else:
+        timelines = synthetic_timelines(args.days)
+        horizon = args.days * 86400
+
+    # A fixed sweep is the adaptive scheduler with its bounds pinned to one interval
+    fixed = PollScheduler(args.fixed_interval, args.fixed_interval, args.fixed_interval)
+    report(f"Fixed {args.fixed_interval}s sweep", *replay(timelines, horizon, fixed))
+    adaptive = PollScheduler(args.min_interval, args.max_interval)
+    report(f"Adaptive ({args.min_interval}s-{args.max_interval}s)", *replay(timelines, horizon, adaptive))
+
+
+if __name__ == '__main__':
+    main()
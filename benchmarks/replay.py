@@ -0,0 +1,344 @@
+"""Offline replay benchmark of the whole fetch -> parse -> match pipeline.
+
+Serves recorded and synthetic RSS/HTML fixtures from a local HTTP server with configurable
+latency and failure rate, then times parse_rss, parse_news, check_keywords and complete
+monitoring cycles (main.run_cycle) against it. Reports throughput, per-stage latency
+percentiles and peak RSS, and can save the results as a baseline JSON to compare later runs.
+
+Usage: python -m benchmarks.replay [--feeds N] [--pages N] [--latency S] [--failure-rate F]
+                                   [--save benchmarks/baseline.json] [--compare benchmarks/baseline.json]
+"""
+import argparse
+import contextlib
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import string
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import main as monitor
+from config import Site
+from fetch_pool import FetchPool
+from notify import NotificationDispatcher
+from pipeline import Pipeline, percentile
+from polling import PollScheduler
+from seen_store import SeenStore
+from story_index import StoryIndex
+from watermarks import WatermarkStore
+
+HTML_FIXTURES = ['test2.txt', 'test.txt']
+HEADLINE_SELECTOR = ('a', {'data-testid': 'header-story-title'}) # the selector used in config.json
+
+
+def random_words(rng, count):
+    return ' '.join(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(count))
+
+
+def build_feed(rng, index, items, keywords):
+    """An RSS 2.0 document whose items mention a keyword about one time in ten."""
+    entries = []
+    for item in range(items):
+        title = random_words(rng, 8)
+        if rng.random() < 0.1:
+            title += ' ' + rng.choice(keywords)
+        published = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(1_700_000_000 - item * 600))
+        entries.append(
+            f"<item><title>{title}</title><link>http://127.0.0.1/feed{index}/story{item}?utm_source=rss</link>"
+            f"<guid>feed{index}-{item}</guid><pubDate>{published}</pubDate>"
+            f"<description>{random_words(rng, 30)}</description></item>"
+        )
+    return (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>Feed {index}</title>'
+            f'{"".join(entries)}</channel></rss>').encode('utf-8')
+
+
+def build_headline_page(rng, index, items, keywords, filler):
+    """A recorded page (as filler markup) with `items` headline links matching HEADLINE_SELECTOR."""
+    links = []
+    for item in range(items):
+        headline = random_words(rng, 8)
+        if rng.random() < 0.1:
+            headline += ' ' + rng.choice(keywords)
+        links.append(f'<div><a data-testid="header-story-title" href="/page{index}/story{item}">{headline}</a></div>')
+    return filler.replace('</body>', ''.join(links) + '</body>', 1).encode('utf-8')
+
+
+class FixtureServer:
+    """Threaded local HTTP server for the fixtures, with artificial latency and failures."""
+
+    def __init__(self, routes, latency, failure_rate, seed=1):
+        rng = random.Random(seed)
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with lock:
+                    delay = latency * rng.uniform(0.5, 1.5)
+                    fail = rng.random() < failure_rate
+                time.sleep(delay)
+                route = routes.get(self.path)
+                if route is None or fail:
+                    self.send_response(404 if route is None else 503)
+                    self.end_headers()
+                    return
+                content_type, body = route
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'no-store') # every run measures a full download
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silences stdout at the file-descriptor level, including parse worker processes."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(devnull)
+        os.close(saved)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def latency_summary(samples):
+    return {
+        'p50_ms': percentile(samples, 0.5) * 1000,
+        'p95_ms': percentile(samples, 0.95) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+    }
+
+
+def bench_parse_rss(feed_urls):
+    latencies, articles = [], 0
+    for url in feed_urls:
+        found, seconds = timed(monitor.parse_rss, url)
+        latencies.append(seconds)
+        articles += len(found) if isinstance(found, dict) else 0
+    return {'articles': articles, 'articles_per_s': articles / sum(latencies), **latency_summary(latencies)}
+
+
+def bench_parse_news(pages):
+    latencies, parsed = [], []
+    for html in pages:
+        found, seconds = timed(monitor.parse_news, html, 'http://127.0.0.1/', *HEADLINE_SELECTOR)
+        latencies.append(seconds)
+        parsed.append(found)
+    articles = sum(len(found) for found in parsed)
+    return {'articles': articles, 'articles_per_s': articles / sum(latencies), **latency_summary(latencies)}, parsed
+
+
+def bench_check_keywords(article_sets):
+    latencies, articles = [], 0
+    for found in article_sets:
+        _, seconds = timed(monitor.check_keywords, found, monitor.KEYWORD_MATCHER)
+        latencies.append(seconds)
+        articles += len(found)
+    return {'articles': articles, 'articles_per_s': articles / max(sum(latencies), 1e-9), **latency_summary(latencies)}
+
+
+def bench_cycles(pipeline, sites, cycles, state_dir):
+    """Runs the monitor's own cycle (main.run_cycle) over every site, `cycles` times.
+
+    State is kept between cycles as in the monitor: the first cycle polls every site for
+    the first time, the later ones are steady-state cycles that only look at entries
+    newer than the watermarks (none, the fixtures do not change).
+    """
+    seen = SeenStore(os.path.join(state_dir, 'seen.db'))
+    watermarks = WatermarkStore(os.path.join(state_dir, 'feed_state.db'))
+    stories = StoryIndex(monitor.STORY_SIMILARITY_THRESHOLD, monitor.STORY_DESCRIPTION_THRESHOLD)
+    notifier = NotificationDispatcher([]) # No sinks: alerts are counted, not delivered
+    scheduler = PollScheduler(monitor.POLL_MIN_INTERVAL_SECONDS, monitor.POLL_MAX_INTERVAL_SECONDS,
+                              monitor.POLL_INITIAL_INTERVAL_SECONDS, monitor.POLL_TARGET_NEW_PER_POLL)
+    sites_by_url = {site.url: site for site in sites}
+    for site in sites:
+        scheduler.add(site.url, time.time())
+    cycle_times, runs = [], []
+    for _ in range(cycles):
+        due_sites = [sites_by_url[url] for url in scheduler.pop_due(math.inf)] # Every site, every cycle
+        started = time.perf_counter()
+        runs.append(monitor.run_cycle(due_sites, pipeline, scheduler, watermarks, seen, stories, notifier))
+        cycle_times.append(time.perf_counter() - started)
+    notifier.close()
+    watermarks.close()
+    seen.close()
+    stages = pipeline.stats()
+    steady = cycle_times[1:] or cycle_times
+    return {
+        'cycles': cycles,
+        'sites': len(sites),
+        'articles': runs[0]['new_entries'],
+        'new_matches': sum(run['alerts'] for run in runs),
+        'failed_sites': sum(run['failed'] for run in runs),
+        'articles_per_s': runs[0]['new_entries'] / cycle_times[0],
+        'first_cycle_s': cycle_times[0],
+        'cycle_p50_s': percentile(steady, 0.5),
+        'cycle_max_s': max(steady),
+        'fetch_p50_ms': stages['fetch']['latency_p50'] * 1000,
+        'fetch_p95_ms': stages['fetch']['latency_p95'] * 1000,
+        'parse_p50_ms': stages['parse']['latency_p50'] * 1000,
+        'parse_p95_ms': stages['parse']['latency_p95'] * 1000,
+        'parse_wait_p95_ms': stages['parse']['wait_p95'] * 1000,
+        'parse_peak_pending': stages['parse']['peak_pending'],
+    }
+
+
+def worker_peak_rss_mb(pid):
+    # The workers are started by the forkserver, not by us, so RUSAGE_CHILDREN does not see them
+    try:
+        with open(f"/proc/{pid}/status", encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def peak_rss_mb(pipeline):
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    workers = max((worker_peak_rss_mb(pid) for pid in pipeline.worker_pids()), default=0.0)
+    return {'main_mb': own, 'largest_worker_mb': workers}
+
+
+# Metrics where a higher value is better; for every other numeric metric lower is better
+HIGHER_IS_BETTER = ('articles_per_s',)
+IGNORED = ('articles', 'cycles', 'sites', 'new_matches', 'failed_sites', 'parse_peak_pending')
+
+
+def compare(results, baseline, threshold):
+    print(f"\nComparison with baseline ({baseline['meta'].get('python')}, {baseline['meta'].get('saved_at')}):")
+    regressions = 0
+    for stage, metrics in results.items():
+        if stage == 'meta':
+            continue
+        for name, value in metrics.items():
+            old = baseline.get(stage, {}).get(name)
+            if name in IGNORED or not isinstance(value, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            worse = -change if name in HIGHER_IS_BETTER else change
+            flag = '  REGRESSION' if worse > threshold else ''
+            regressions += bool(flag)
+            print(f"  {stage}.{name}: {old:.2f} -> {value:.2f} ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--feeds', type=int, default=40, help='number of RSS fixtures')
+    parser.add_argument('--feed-items', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=10, help='number of HTML fixtures')
+    parser.add_argument('--page-items', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.05, help='mean server latency in seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.02)
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=monitor.MAX_CONCURRENT_FETCHES)
+    parser.add_argument('--parse-workers', type=int, default=monitor.PARSE_WORKERS)
+    parser.add_argument('--save', help='write the results to this baseline JSON file')
+    parser.add_argument('--compare', help='compare against a baseline JSON file; exits 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative change counted as a regression')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    keywords = monitor.KEYWORDS
+    fillers = []
+    for name in HTML_FIXTURES:
+        with open(name, 'r', encoding='utf-8') as f:
+            fillers.append(f.read())
+
+    routes = {}
+    for index in range(args.feeds):
+        routes[f"/feed/{index}.xml"] = ('application/rss+xml; charset=utf-8', build_feed(rng, index, args.feed_items, keywords))
+    pages = []
+    for index in range(args.pages):
+        body = build_headline_page(rng, index, args.page_items, keywords, fillers[index % len(fillers)])
+        routes[f"/page/{index}.html"] = ('text/html; charset=utf-8', body)
+        pages.append(body)
+
+    # Every cycle replays the same fixtures, which the snapshot store would skip as unchanged
+    monitor.SNAPSHOTS = None
+
+    results = {}
+    with quiet():
+        # All fixtures share one host, so the per-host limit is lifted to the global one
+        fetch_pool = FetchPool(args.concurrency, args.concurrency, 0)
+        pipeline = Pipeline(fetch_pool, args.parse_workers, monitor.MAX_PENDING_PARSES,
+                            mp_context=multiprocessing.get_context(monitor.PARSE_START_METHOD))
+        pipeline.start()
+        with FixtureServer(routes, args.latency, args.failure_rate) as server, tempfile.TemporaryDirectory() as state_dir:
+            feed_urls = [f"{server.base_url}/feed/{index}.xml" for index in range(args.feeds)]
+            sites = [Site(f"feed {index}", url, 'rss') for index, url in enumerate(feed_urls)]
+            sites += [Site(f"page {index}", f"{server.base_url}/page/{index}.html", 'http', *HEADLINE_SELECTOR)
+                      for index in range(args.pages)]
+            monitor.bind_backends(sites)
+            results['parse_rss'] = bench_parse_rss(feed_urls)
+            results['parse_news'], parsed_pages = bench_parse_news(pages)
+            results['check_keywords'] = bench_check_keywords(parsed_pages)
+            results['cycle'] = bench_cycles(pipeline, sites, args.cycles, state_dir)
+        results['memory'] = peak_rss_mb(pipeline)
+        pipeline.shutdown()
+        fetch_pool.shutdown()
+    results['meta'] = {
+        'python': platform.python_version(),
+        'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'args': vars(args),
+    }
+
+    for stage, metrics in results.items():
+        if stage == 'meta':
+            continue
+        print(f"{stage}:")
+        for name, value in metrics.items():
+            print(f"  {name:18} {value:,.2f}" if isinstance(value, float) else f"  {name:18} {value}")
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        exit_code = 1 if regressions else 0
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
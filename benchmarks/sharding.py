@@ -0,0 +1,100 @@
+"""Simulates monitor nodes splitting the sites through LeaseStore, on simulated time.
+
+Checks that every site has exactly one owner, how evenly the sites spread, how many move
+when a node joins (ideally sites / nodes), how long a crashed node's sites stay unpolled,
+and what one claim() round costs.
+
+Usage: python -m benchmarks.sharding [--sites N] [--nodes N] [--lease S] [--rebalance S]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from cluster import LeaseStore
+
+
+def settle(nodes, keys, now, rounds=3):
+    """Lets every node claim a few times, as their rebalance loops would; returns {node: owned keys}."""
+    owned = {}
+    for _ in range(rounds):
+        for node in nodes:
+            owned[node.node_id] = node.claim(keys, now)
+    return owned
+
+
+def check_exclusive(owned, keys):
+    claims = [key for keys_owned in owned.values() for key in keys_owned]
+    return len(claims) - len(set(claims)), len(set(keys) - set(claims))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sites', type=int, default=500)
+    parser.add_argument('--nodes', type=int, default=4)
+    parser.add_argument('--lease', type=float, default=180)
+    parser.add_argument('--rebalance', type=float, default=60, help='seconds between claim() rounds of a node')
+    args = parser.parse_args()
+
+    keys = [f"https://site-{index}.example.com/feed" for index in range(args.sites)]
+    with tempfile.TemporaryDirectory() as state_dir:
+        path = os.path.join(state_dir, 'cluster.db')
+        nodes = [LeaseStore(path, f"node-{index}", args.lease) for index in range(args.nodes)]
+        now = 1_000_000.0
+        for node in nodes:
+            node.heartbeat(now)
+        owned = settle(nodes, keys, now)
+        doubled, orphaned = check_exclusive(owned, keys)
+        counts = [len(keys_owned) for keys_owned in owned.values()]
+        print(f"{args.nodes} nodes, {args.sites} sites: {doubled} claimed twice, {orphaned} unowned, "
+              f"per node min {min(counts)} / mean {statistics.mean(counts):.0f} / max {max(counts)}")
+
+        # A node joins: only the sites it now ranks highest for should move, and never be owned twice
+        now += args.rebalance
+        newcomer = LeaseStore(path, f"node-{args.nodes}", args.lease)
+        newcomer.heartbeat(now)
+        nodes.append(newcomer)
+        before = owned
+        owned = {node.node_id: node.claim(keys, now) for node in nodes}
+        doubled, orphaned = check_exclusive(owned, keys)
+        print(f"Join, first round: {doubled} claimed twice, {orphaned} waiting for handover")
+        now += args.rebalance
+        owned = settle(nodes, keys, now)
+        moved = sum(len(owned[node_id] - keys_owned) for node_id, keys_owned in before.items())
+        moved += len(owned[newcomer.node_id])
+        doubled, orphaned = check_exclusive(owned, keys)
+        print(f"Join, settled: {len(owned[newcomer.node_id])} sites moved to the new node "
+              f"(ideal {args.sites / len(nodes):.0f}), {moved - len(owned[newcomer.node_id])} moved between old nodes, "
+              f"{doubled} claimed twice, {orphaned} unowned")
+
+        # A node crashes: no release, no more heartbeats; the others take over once its leases expire
+        crashed = nodes.pop(0)
+        lost = owned.pop(crashed.node_id)
+        crashed.conn.close()
+        waited = 0.0
+        while True:
+            now += args.rebalance
+            waited += args.rebalance
+            for node in nodes:
+                node.heartbeat(now)
+            owned = settle(nodes, keys, now, rounds=1)
+            doubled, orphaned = check_exclusive(owned, keys)
+            if not orphaned:
+                break
+        print(f"Crash of a node owning {len(lost)} sites: all taken over after {waited:.0f}s "
+              f"(lease {args.lease:.0f}s), {doubled} claimed twice")
+
+        # Cost of one rebalance round on a settled cluster
+        samples = []
+        for _ in range(20):
+            started = time.perf_counter()
+            nodes[0].claim(keys, now)
+            samples.append(time.perf_counter() - started)
+        print(f"claim() over {args.sites} sites: median {statistics.median(samples) * 1000:.1f} ms")
+        for node in nodes:
+            node.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Startup cost of the monitor for different site mixes, measured with `python -X importtime`.
+
+Each scenario starts a fresh interpreter that imports main.py with a generated config and
+binds the fetch backends, as the monitor does before its first cycle. Reports wall time,
+total import time, peak RSS and the most expensive top-level imports. The "eager" scenario
+imports everything main.py used to load up front, for comparison.
+
+Usage: python -m benchmarks.startup [--runs N] [--top N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FEED = {'name': 'feed', 'url': 'https://example.com/feed.xml', 'rss': 1}
+PAGE = {'name': 'page', 'url': 'https://example.com/', 'rss': 0,
+        'soup_selector_ele': 'a', 'soup_selector_identifier': {'class': 'title'}}
+RENDERED_PAGE = dict(PAGE, name='rendered page', url='https://example.org/', selenium=1, selenium_selector_str='a.title')
+
+# name -> (sites in the config, extra modules imported before main)
+SCENARIOS = {
+    'rss only': ([FEED], ()),
+    'rss + html': ([FEED, PAGE], ()),
+    'rss + html + selenium': ([FEED, PAGE, RENDERED_PAGE], ()),
+    'eager (all backends up front)': ([FEED], ('requests', 'feedparser', 'smtplib', 'email.mime.text', 'lxml.etree',
+                                               'bs4', 'selenium.webdriver', 'selenium.webdriver.support.ui')),
+}
+
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+import main
+main.bind_backends(main.NEWS_WEBSITES)
+main.create_notifier()
+elapsed = time.perf_counter() - started
+scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+print(json.dumps({{'seconds': elapsed, 'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+                  'backends': sorted(main.BACKENDS)}}))
+"""
+
+
+def parse_importtime(stderr):
+    """Returns (total self time in seconds, {top-level module: cumulative seconds}) from -X importtime output."""
+    total, top_level = 0, {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = (part for part in line[len('import time:'):].split('|'))
+        total += int(self_us)
+        if not name.startswith('  '): # nested imports are indented
+            top_level[name.strip()] = int(cumulative_us) / 1e6
+    return total / 1e6, top_level
+
+
+def run_scenario(sites, modules, config_dir):
+    config_path = os.path.join(config_dir, 'config.json')
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump({'keywords': ['Hertz', 'Subaru', '星辉集团'], 'websites': sites}, f)
+    env = dict(os.environ, MONITOR_CONFIG=config_path)
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD.format(modules=list(modules))],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['import_seconds'], result['top_imports'] = parse_importtime(completed.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per scenario (median is reported)')
+    parser.add_argument('--top', type=int, default=5, help='number of slowest top-level imports to list')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        for name, (sites, modules) in SCENARIOS.items():
+            runs = [run_scenario(sites, modules, config_dir) for _ in range(args.runs)]
+            print(f"{name}:")
+            print(f"  backends           {', '.join(runs[-1]['backends'])}")
+            print(f"  startup_ms         {statistics.median(run['seconds'] for run in runs) * 1000:,.1f}")
+            print(f"  import_ms          {statistics.median(run['import_seconds'] for run in runs) * 1000:,.1f}")
+            print(f"  peak_rss_mb        {statistics.median(run['rss_mb'] for run in runs):,.1f}")
+            slowest = sorted(runs[-1]['top_imports'].items(), key=lambda item: item[1], reverse=True)[:args.top]
+            for module, seconds in slowest:
+                print(f"    {module:30} {seconds * 1000:8,.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
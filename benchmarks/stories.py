@@ -0,0 +1,138 @@
+"""Insert and lookup cost of StoryIndex as it grows, against comparing with every article.
+
+Fills the index with synthetic headlines and descriptions and, at each checkpoint, times
+add() and find() for fresh articles, counts the LSH candidates a lookup compares against,
+and times a brute-force scan over all signatures for contrast. Also checks how many
+reworded copies of indexed stories are found, and how many unrelated articles are merged.
+Random words share little, so the last figure says nothing about real headlines: a
+separate case feeds car reviews with templated headlines and descriptions ("2025 Subaru
+Outback Review, Pricing, and Specs") from several sites and counts how many distinct
+articles get merged.
+
+Usage: python -m benchmarks.stories [--sizes N,N,...] [--queries N]
+"""
+import argparse
+import itertools
+import random
+import resource
+import sys
+import time
+
+from story_index import StoryIndex, minhash, similarity, story_text
+
+VOCABULARY_SIZE = 20000
+SITES = 50
+
+MODELS = {
+    'Subaru': ['Outback', 'Forester', 'Crosstrek', 'Ascent', 'WRX', 'Impreza'],
+    'Toyota': ['Camry', 'Corolla', 'RAV4', 'Highlander', 'Tacoma', 'Tundra'],
+    'Hyundai': ['Elantra', 'Sonata', 'Tucson', 'Santa Fe', 'Palisade', 'Ioniq 5'],
+    'Ford': ['Mustang', 'Bronco', 'Explorer', 'Escape', 'Maverick', 'F-150'],
+    'Honda': ['Civic', 'Accord', 'CR-V', 'Pilot', 'HR-V', 'Odyssey'],
+}
+# (headline, description) templates per site; sites of one publisher share the headline template
+TEMPLATES = {
+    'Car and Driver': ("{year} {make} {model} Review, Pricing, and Specs",
+                       "Check out the {year} {make} {model} review at Car and Driver. Use our Car Buying Guide "
+                       "to research {make} {model} prices, specs, photos, videos, and more."),
+    'Road and Track': ("{year} {make} {model} Review, Pricing, and Specs",
+                       "Road & Track drives the {year} {make} {model}: how it performs on the road and on track."),
+    'MotorTrend': ("{year} {make} {model} Prices, Reviews, and Photos",
+                   "Research the {year} {make} {model} with our expert reviews and ratings."),
+    'Autoexpress': ("New {year} {make} {model} review",
+                    "The {make} {model} has been updated for {year}; read our full review of the {model}."),
+}
+
+
+def build_vocabulary(rng, size=VOCABULARY_SIZE):
+    letters = 'etaoinshrdlcumwfgypbvkjxqz'
+    weights = [12, 9, 8, 8, 7, 7, 6, 6, 6, 4, 4, 3, 3, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1, 1, 1, 1]
+    return [''.join(rng.choices(letters, weights, k=rng.randint(2, 10))) for _ in range(size)]
+
+
+class ArticleGenerator:
+    """Random headlines and descriptions whose word frequencies roughly follow Zipf's law, like news text."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.words = build_vocabulary(rng)
+        self.cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(self.words) + 1)))
+
+    def sentence(self, low, high):
+        return ' '.join(self.rng.choices(self.words, cum_weights=self.cum_weights, k=self.rng.randint(low, high)))
+
+    def article(self):
+        return self.sentence(7, 12).capitalize(), self.sentence(20, 35)
+
+    def reword(self, headline, description):
+        """A syndicated copy: a source suffix on the headline and a couple of words changed."""
+        words = description.split()
+        for _ in range(2):
+            words[self.rng.randrange(len(words))] = self.rng.choice(self.words)
+        return f"{headline} - {self.rng.choice(['Reuters', 'AP', 'Bloomberg'])}", ' '.join(words)
+
+
+def templated_articles(rng):
+    """One review per site, year and model: every article is distinct, so any merge is a false one."""
+    articles = [(site, headline.format(year=year, make=make, model=model),
+                 description.format(year=year, make=make, model=model))
+                for site, (headline, description) in TEMPLATES.items()
+                for year in (2024, 2025, 2026)
+                for make, models in MODELS.items()
+                for model in models]
+    rng.shuffle(articles)
+    return articles
+
+
+def peak_rss_mb():
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000,300000', help='index sizes to measure at')
+    parser.add_argument('--queries', type=int, default=500, help='lookups timed per checkpoint')
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+
+    generator = ArticleGenerator(random.Random(42))
+    index = StoryIndex(max_items=sizes[-1], max_age_days=365)
+    originals = []
+    started_rss = peak_rss_mb()
+    for size in sizes:
+        batch = [generator.article() for _ in range(size - len(index))]
+        originals.extend(batch[:args.queries - len(originals)])
+        fill_started = time.perf_counter()
+        for number, (headline, description) in enumerate(batch):
+            index.add(f"site{number % SITES}", headline, description)
+        insert_us = (time.perf_counter() - fill_started) / len(batch) * 1e6
+
+        queries = [generator.article() for _ in range(args.queries)]
+        candidates_before = index.stats['candidates']
+        lookup_started = time.perf_counter()
+        merged = sum(index.find(headline, description)[0] is not None for headline, description in queries)
+        lookup_us = (time.perf_counter() - lookup_started) / len(queries) * 1e6
+        candidates = (index.stats['candidates'] - candidates_before) / len(queries)
+
+        found = sum(index.find(*generator.reword(*original), site='wire')[0] is not None for original in originals)
+
+        signatures = [signature for signature, *_ in index._items.values()]
+        probe = minhash(story_text(' '.join(queries[0])), index.num_perm)
+        scan_started = time.perf_counter()
+        any(similarity(probe, signature) >= index.threshold for signature in signatures)
+        scan_ms = (time.perf_counter() - scan_started) * 1000
+
+        print(f"{size:>8,} articles: add {insert_us:6.1f} us, find {lookup_us:6.1f} us "
+              f"({candidates:5.1f} candidates) vs full scan {scan_ms:8.1f} ms | "
+              f"reworded copies found {found}/{len(originals)}, unrelated merged {merged}/{len(queries)} | "
+              f"+{peak_rss_mb() - started_rss:,.0f} MB")
+
+    articles = templated_articles(random.Random(42))
+    templated = StoryIndex(max_age_days=365)
+    merged = sum(not templated.add(*article)[1] for article in articles)
+    print(f"templated headlines: {len(articles)} distinct reviews from {len(TEMPLATES)} sites, falsely merged {merged}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException
+
+
+class PooledDriver:
+    """A live browser together with the bookkeeping the pool keeps about it."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, driver):
+        self.id = next(self._ids)
+        self.driver = driver
+        self.created_at = time.time()
+        self.pages = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+    def stats(self):
+        return {
+            'id': self.id,
+            'pages': self.pages,
+            'errors': self.errors,
+            'busy_seconds': round(self.busy_seconds, 2),
+            'age_seconds': round(time.time() - self.created_at, 2),
+        }
+
+
+class BrowserPool:
+    """Keeps a bounded set of warm WebDriver instances and hands one out per job.
+
+    `driver_factory` is called whenever a new browser is needed. Between jobs the
+    driver is reset (extra tabs closed, cookies cleared, blank page loaded). A driver
+    is quit and replaced after `max_pages` jobs, or as soon as a job crashes it.
+    """
+
+    def __init__(self, driver_factory, size=2, max_pages=50):
+        self.driver_factory = driver_factory
+        self.size = size
+        self.max_pages = max_pages
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = [] # drivers ready to be handed out
+        self._all = {} # id -> PooledDriver for every live driver
+        self._retired = 0
+        self._closed = False
+
+    def prewarm(self, count=None):
+        """Starts up to `count` browsers ahead of time so the first jobs skip the launch."""
+        count = self.size if count is None else min(count, self.size)
+        with self._lock:
+            missing = count - len(self._all)
+        for _ in range(max(missing, 0)):
+            pooled = self._create()
+            with self._lock:
+                self._idle.append(pooled)
+
+    def _create(self):
+        pooled = PooledDriver(self.driver_factory())
+        with self._lock:
+            self._all[pooled.id] = pooled
+        return pooled
+
+    def _retire(self, pooled):
+        with self._lock:
+            if self._all.pop(pooled.id, None) is None:
+                return # already quit, e.g. by close()
+            self._retired += 1
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def _reset(self, pooled):
+        driver = pooled.driver
+        handles = driver.window_handles
+        # Close every tab the job opened, keeping only the first one
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.delete_all_cookies()
+        driver.get('about:blank')
+
+    @contextmanager
+    def driver(self):
+        """Context manager yielding a ready-to-use driver for the duration of one job."""
+        if self._closed:
+            raise RuntimeError('BrowserPool is closed')
+        self._slots.acquire()
+        pooled = None
+        healthy = True
+        started = time.monotonic()
+        try:
+            with self._lock:
+                pooled = self._idle.pop() if self._idle else None
+            if pooled is None:
+                pooled = self._create()
+            yield pooled.driver
+        except TimeoutException:
+            # A slow page is not the browser's fault, keep the driver
+            if pooled is not None:
+                pooled.errors += 1
+            raise
+        except Exception:
+            if pooled is not None:
+                pooled.errors += 1
+            healthy = False
+            raise
+        finally:
+            if pooled is not None:
+                pooled.pages += 1
+                pooled.busy_seconds += time.monotonic() - started
+                self._release(pooled, healthy)
+            self._slots.release()
+
+    def _release(self, pooled, healthy):
+        if healthy and pooled.pages < self.max_pages and not self._closed:
+            try:
+                self._reset(pooled)
+            except Exception:
+                pass # a driver that cannot be reset is retired below
+            else:
+                with self._lock:
+                    self._idle.append(pooled)
+                return
+        self._retire(pooled)
+
+    def stats(self):
+        """Returns per-driver stats plus totals for the pool."""
+        with self._lock:
+            drivers = [pooled.stats() for pooled in self._all.values()]
+            return {
+                'size': self.size,
+                'live': len(self._all),
+                'idle': len(self._idle),
+                'retired': self._retired,
+                'drivers': drivers,
+            }
+
+    def close(self):
+        """Quits every browser the pool owns."""
+        with self._lock:
+            self._closed = True
+            drivers = list(self._all.values())
+            self._idle.clear()
+        for pooled in drivers:
+            self._retire(pooled)
@@ -0,0 +1,135 @@
+import codecs
+import re
+import threading
+
+# Only this much of a body is scanned for <meta charset> or fed to statistical detection
+META_SCAN_BYTES = 4096
+DETECT_SCAN_BYTES = 64 * 1024
+
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+# Labels pages use for a narrower charset than they really contain, as browsers treat them
+SUPERSETS = {
+    'gb2312': 'gb18030',
+    'gbk': 'gb18030',
+    'big5': 'big5hkscs',
+    'ascii': 'cp1252',
+    'latin-1': 'cp1252',
+    'iso8859-1': 'cp1252',
+    'euc_kr': 'cp949',
+    'shift_jis': 'cp932',
+}
+
+_META_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+_XML_DECL_RE = re.compile(rb'^<\?xml[^>]+encoding\s*=\s*["\']([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+
+
+def normalize_charset(label):
+    """Canonical Python codec name for a charset label, or None if Python does not know it."""
+    if not label:
+        return None
+    try:
+        name = codecs.lookup(label.strip().strip('"\'').lower()).name
+    except LookupError:
+        return None
+    return SUPERSETS.get(name, name)
+
+
+def header_charset(headers):
+    """Returns the charset named in a Content-Type header, if there is one."""
+    for param in headers.get('content-type', '').split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset' and value.strip():
+            return value.strip().strip('"\'')
+    return None
+
+
+def bom_charset(body):
+    for bom, name in BOMS:
+        if body.startswith(bom):
+            return name
+    return None
+
+
+def meta_charset(body, limit=META_SCAN_BYTES):
+    """The charset a page declares in a <meta> tag (or an XML declaration) near its start."""
+    prefix = body[:limit]
+    match = _XML_DECL_RE.search(prefix) or _META_RE.search(prefix)
+    return match.group(1).decode('ascii') if match else None
+
+
+def decodes_cleanly(body, charset, limit=DETECT_SCAN_BYTES):
+    """Whether the first `limit` bytes are valid in `charset` (a sequence cut off at the end is fine)."""
+    decoder = codecs.getincrementaldecoder(charset)(errors='strict')
+    try:
+        decoder.decode(body[:limit], final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def detect_charset(body, limit=DETECT_SCAN_BYTES):
+    """Guesses the charset of an undeclared body from its first `limit` bytes only."""
+    prefix = body[:limit]
+    if decodes_cleanly(prefix, 'utf-8'):
+        return 'utf-8' # Also covers pure ASCII; other multi-byte text almost never passes this
+    try:
+        from charset_normalizer import from_bytes # Installed with requests
+    except ImportError:
+        from_bytes = None
+    if from_bytes is not None:
+        best = from_bytes(prefix).best()
+        if best is not None and normalize_charset(best.encoding):
+            return normalize_charset(best.encoding)
+    for candidate in ('gb18030', 'big5hkscs', 'cp1252'):
+        if decodes_cleanly(prefix, candidate):
+            return candidate
+    return 'cp1252'
+
+
+class CharsetResolver:
+    """Works out how to decode each fetched page without decoding or scanning all of it.
+
+    In order: a byte order mark, the Content-Type header, a <meta charset> in the first
+    few KB, then statistical detection over a bounded prefix. A declared charset is only
+    believed if the prefix actually decodes with it, since Chinese sites in particular
+    often label GBK pages as UTF-8 or the reverse. Detection results are cached per site
+    and reused for as long as they keep decoding cleanly, so a site is only detected once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._detected = {} # site -> charset found by detection
+        self.stats = {'bom': 0, 'header': 0, 'meta': 0, 'cached': 0, 'detected': 0}
+
+    def _count(self, source):
+        with self._lock:
+            self.stats[source] += 1
+
+    def resolve(self, site, body, headers=None):
+        """Returns (charset, how it was found) for a raw response body of `site`."""
+        charset = bom_charset(body)
+        if charset:
+            self._count('bom')
+            return charset, 'bom'
+        for source, label in (('header', header_charset(headers or {})), ('meta', meta_charset(body))):
+            charset = normalize_charset(label)
+            if charset and decodes_cleanly(body, charset):
+                self._count(source)
+                return charset, source
+        with self._lock:
+            charset = self._detected.get(site)
+        if charset and decodes_cleanly(body, charset):
+            self._count('cached')
+            return charset, 'cached'
+        charset = detect_charset(body)
+        with self._lock:
+            self._detected[site] = charset
+        self._count('detected')
+        return charset, 'detected'
@@ -0,0 +1,142 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+def rendezvous_score(node_id, key):
+    """Highest-random-weight hash: the live node with the highest score for a site owns it."""
+    digest = hashlib.blake2b(f"{node_id}\0{key}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def preferred_node(nodes, key):
+    return max(nodes, key=lambda node_id: rendezvous_score(node_id, key)) if nodes else None
+
+
+class LeaseStore:
+    """Splits the sites between monitor nodes through leases in a shared SQLite file.
+
+    Every node heartbeats into the `nodes` table. A site belongs to the live node with the
+    highest rendezvous hash for it, so adding or removing a node only moves that node's
+    share of the sites. A node polls a site only while it holds the site's lease, and
+    takes a lease only once it is free or expired: a site is never fetched by two nodes
+    at once, even while ownership moves. Leases last `lease_seconds` and are renewed by
+    a background heartbeat, so a node that dies loses its sites to the others once its
+    leases run out, and a node that shuts down cleanly hands them over right away.
+    """
+
+    def __init__(self, path, node_id, lease_seconds=180):
+        self.path = path
+        self.node_id = node_id
+        self.lease_seconds = lease_seconds
+        self.conn = self._connect()
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS nodes ('
+            ' node_id TEXT PRIMARY KEY,'
+            ' heartbeat_at REAL NOT NULL'
+            ')'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS leases ('
+            ' site TEXT PRIMARY KEY,'
+            ' node_id TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL'
+            ')'
+        )
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _heartbeat(self, conn, now):
+        conn.execute(
+            'INSERT INTO nodes (node_id, heartbeat_at) VALUES (?, ?)'
+            ' ON CONFLICT(node_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at',
+            (self.node_id, now),
+        )
+        conn.execute('UPDATE leases SET expires_at = ? WHERE node_id = ?', (now + self.lease_seconds, self.node_id))
+
+    def heartbeat(self, now=None):
+        """Marks this node alive and renews every lease it holds."""
+        now = time.time() if now is None else now
+        self._heartbeat(self.conn, now)
+
+    def live_nodes(self, now=None):
+        now = time.time() if now is None else now
+        rows = self.conn.execute('SELECT node_id FROM nodes WHERE heartbeat_at > ?', (now - self.lease_seconds,))
+        return sorted(node_id for (node_id,) in rows)
+
+    def claim(self, keys, now=None):
+        """Takes the leases of the sites this node should own and releases the ones it should not.
+
+        Returns the set of keys this node holds a lease on afterwards. Sites it should own
+        but another node still holds are left alone; that node releases them the next
+        time it calls claim(), or they expire.
+        """
+        now = time.time() if now is None else now
+        conn = self.conn
+        conn.execute('BEGIN IMMEDIATE') # One node rebalances at a time
+        try:
+            self._heartbeat(conn, now)
+            live = [node_id for (node_id,) in conn.execute(
+                'SELECT node_id FROM nodes WHERE heartbeat_at > ?', (now - self.lease_seconds,))]
+            held = dict((site, (node_id, expires_at)) for site, node_id, expires_at in
+                        conn.execute('SELECT site, node_id, expires_at FROM leases'))
+            owned = set()
+            for key in keys:
+                holder, expires_at = held.get(key, (None, 0))
+                taken = holder is not None and expires_at > now
+                if preferred_node(live, key) == self.node_id:
+                    if not taken or holder == self.node_id:
+                        conn.execute(
+                            'INSERT INTO leases (site, node_id, expires_at) VALUES (?, ?, ?)'
+                            ' ON CONFLICT(site) DO UPDATE SET node_id = excluded.node_id, expires_at = excluded.expires_at',
+                            (key, self.node_id, now + self.lease_seconds),
+                        )
+                        owned.add(key)
+                elif holder == self.node_id:
+                    # Another live node ranks higher for this site now (e.g. it just joined): hand it over
+                    conn.execute('DELETE FROM leases WHERE site = ? AND node_id = ?', (key, self.node_id))
+            # Forget nodes that have been silent for a long time
+            conn.execute('DELETE FROM nodes WHERE heartbeat_at < ?', (now - 10 * self.lease_seconds,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return owned
+
+    def _run(self, interval):
+        conn = self._connect()
+        try:
+            while not self._stopping.wait(interval):
+                try:
+                    self._heartbeat(conn, time.time())
+                except sqlite3.Error:
+                    pass # Retried on the next beat; leases outlive several missed beats
+        finally:
+            conn.close()
+
+    def start_heartbeat(self, interval=None):
+        """Renews this node's leases from a background thread, every third of the lease by default.
+
+        Keeps the leases alive through cycles that take longer than a lease.
+        """
+        self._thread = threading.Thread(target=self._run, args=(interval or self.lease_seconds / 3,),
+                                        name='heartbeat', daemon=True)
+        self._thread.start()
+
+    def release(self):
+        """Gives up every lease and leaves the cluster, so other nodes take over immediately."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.conn.execute('DELETE FROM leases WHERE node_id = ?', (self.node_id,))
+        self.conn.execute('DELETE FROM nodes WHERE node_id = ?', (self.node_id,))
+
+    def close(self):
+        self.release()
+        self.conn.close()
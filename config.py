@@ -0,0 +1,118 @@
+import json
+
+# Fetch backends a site can use (see backends/)
+BACKEND_NAMES = ('rss', 'http', 'selenium')
+
+
+class ConfigError(ValueError):
+    """config.json is missing required settings or has invalid ones."""
+
+
+class Site:
+    """One monitored site, validated and resolved once when the config is loaded.
+
+    `backend` names the fetch backend the site uses. `fetcher` is that backend's
+    instance, bound at startup in the main process only; it is not sent to the parse
+    workers along with the rest of the site.
+    """
+
+    def __init__(self, name, url, backend, selector_tag=None, selector_attrs=None, wait_selector=None,
+                 min_interval=None, max_interval=None):
+        self.name = name
+        self.url = url
+        self.backend = backend
+        self.selector_tag = selector_tag # Tag holding each headline link, e.g. 'a'
+        self.selector_attrs = selector_attrs or {} # Attributes it must have, e.g. {'class': 'title'}
+        self.wait_selector = wait_selector # CSS selector Selenium waits for before reading the page
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.fetcher = None
+
+    @property
+    def is_feed(self):
+        return self.backend == 'rss'
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['fetcher'] = None
+        return state
+
+    def __repr__(self):
+        return f"Site({self.name!r}, {self.backend})"
+
+
+class Config:
+    """The keywords and compiled site plan from config.json."""
+
+    def __init__(self, keywords, sites):
+        self.keywords = keywords
+        self.sites = sites
+
+    @property
+    def backends(self):
+        """Names of the fetch backends at least one site needs."""
+        return {site.backend for site in self.sites}
+
+
+def _interval(entry, key, label):
+    value = entry.get(key)
+    if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0):
+        raise ConfigError(f"{label}: '{key}' must be a positive number of seconds")
+    return value
+
+
+def compile_site(entry, index=0):
+    """Turns one "websites" entry of config.json into a Site, raising ConfigError if it is invalid.
+
+    The backend is "rss" for "rss": 1, "selenium" for pages with "selenium": 1 and
+    "http" otherwise, unless the entry names one with "backend".
+    """
+    if not isinstance(entry, dict):
+        raise ConfigError(f"websites[{index}] must be an object")
+    label = f"websites[{index}] ({entry.get('name', 'unnamed')})"
+    for key in ('name', 'url'):
+        if not isinstance(entry.get(key), str) or not entry[key].strip():
+            raise ConfigError(f"{label}: '{key}' is required")
+    url = entry['url'].strip()
+    if not url.startswith(('http://', 'https://')):
+        raise ConfigError(f"{label}: 'url' must start with http:// or https://")
+
+    backend = entry.get('backend') or ('rss' if entry.get('rss') else 'selenium' if entry.get('selenium') else 'http')
+    if backend not in BACKEND_NAMES:
+        raise ConfigError(f"{label}: unknown backend '{backend}' (expected one of {', '.join(BACKEND_NAMES)})")
+
+    selector_tag = selector_attrs = wait_selector = None
+    if backend != 'rss':
+        selector_tag = entry.get('soup_selector_ele')
+        selector_attrs = entry.get('soup_selector_identifier') or {}
+        if not isinstance(selector_tag, str) or not selector_tag:
+            raise ConfigError(f"{label}: 'soup_selector_ele' is required for HTML pages")
+        if not isinstance(selector_attrs, dict):
+            raise ConfigError(f"{label}: 'soup_selector_identifier' must be an object of attributes")
+    if backend == 'selenium':
+        wait_selector = entry.get('selenium_selector_str')
+        if not isinstance(wait_selector, str) or not wait_selector:
+            raise ConfigError(f"{label}: 'selenium_selector_str' is required for Selenium pages")
+
+    return Site(
+        entry['name'], url, backend, selector_tag, selector_attrs, wait_selector,
+        _interval(entry, 'min_interval_seconds', label), _interval(entry, 'max_interval_seconds', label),
+    )
+
+
+def load_config(path='config.json'):
+    """Reads and validates config.json once. Raises OSError, json.JSONDecodeError or ConfigError."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    keywords = data.get('keywords')
+    if not isinstance(keywords, list) or not all(isinstance(keyword, str) for keyword in keywords):
+        raise ConfigError("'keywords' must be a list of strings")
+    websites = data.get('websites')
+    if not isinstance(websites, list):
+        raise ConfigError("'websites' must be a list")
+    sites = [compile_site(entry, index) for index, entry in enumerate(websites)]
+    names = [site.name for site in sites]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ConfigError(f"site names must be unique, found duplicates: {', '.join(duplicates)}")
+    return Config(keywords, sites)
@@ -0,0 +1,119 @@
+import heapq
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+
+def host_key(url):
+    """Returns the host a URL belongs to, used to group politeness limits per domain."""
+    host = (urlparse(url).hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return host
+
+
+class FetchPool:
+    """Runs fetch jobs in parallel with a global limit, a per-host limit and a per-host delay.
+
+    The global limit is the size of the worker pool. Jobs first wait in a queue of their
+    host and are only handed to a worker once the host has fewer than `per_host_limit`
+    jobs running and `per_host_delay` seconds have passed since its last start, so a
+    worker never sits idle waiting on a host's politeness delay: a busy host only slows
+    down its own sites, and sites on other hosts go ahead of it.
+    """
+
+    def __init__(self, max_workers=8, per_host_limit=2, per_host_delay=5):
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.per_host_delay = per_host_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+        self._lock = threading.RLock()
+        self._wakeup = threading.Condition(self._lock)
+        self._waiting = {} # host -> deque of (future, fn, args, kwargs) not yet handed to a worker
+        self._running = {} # host -> number of its jobs handed to the executor
+        self._next_start = {} # host -> earliest monotonic time the next job may start
+        self._timers = [] # heap of (monotonic time, host) at which a waiting host's delay runs out
+        self._closed = False
+        self._timer_thread = threading.Thread(target=self._run_timers, name='fetch-timers', daemon=True)
+        self._timer_thread.start()
+
+    def _dispatch(self, host):
+        # Called with the lock held: start as many of the host's waiting jobs as it is allowed
+        waiting = self._waiting.get(host)
+        while waiting and not self._closed and self._running.get(host, 0) < self.per_host_limit:
+            now = time.monotonic()
+            start = self._next_start.get(host, now)
+            if start > now:
+                heapq.heappush(self._timers, (start, host))
+                self._wakeup.notify()
+                return
+            future, fn, args, kwargs = waiting.popleft()
+            if future.cancelled():
+                continue
+            self._running[host] = self._running.get(host, 0) + 1
+            self._next_start[host] = now + self.per_host_delay
+            task = self._executor.submit(self._run, host, future, fn, args, kwargs)
+            task.add_done_callback(lambda task, host=host, future=future: self._task_done(host, future, task))
+        if not waiting:
+            self._waiting.pop(host, None)
+
+    def _run_timers(self):
+        with self._wakeup:
+            while not self._closed:
+                if not self._timers:
+                    self._wakeup.wait()
+                    continue
+                when, host = self._timers[0]
+                delay = when - time.monotonic()
+                if delay > 0:
+                    self._wakeup.wait(delay)
+                    continue
+                heapq.heappop(self._timers)
+                self._dispatch(host)
+
+    def _release(self, host):
+        with self._lock:
+            self._running[host] -= 1
+            self._dispatch(host)
+
+    def _run(self, host, future, fn, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            self._release(host)
+            return
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._release(host)
+            future.set_exception(e)
+        else:
+            self._release(host)
+            future.set_result(result)
+
+    def _task_done(self, host, future, task):
+        # Only matters for jobs cancelled in the executor queue by shutdown(): _run never ran
+        if task.cancelled():
+            future.cancel()
+            self._release(host)
+
+    def submit(self, url, fn, *args, **kwargs):
+        """Schedules fn(*args, **kwargs) as a fetch of `url` and returns its Future."""
+        future = Future()
+        host = host_key(url)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('cannot submit after shutdown')
+            self._waiting.setdefault(host, deque()).append((future, fn, args, kwargs))
+            self._dispatch(host)
+        return future
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            self._closed = True
+            waiting = [job for jobs in self._waiting.values() for job in jobs]
+            self._waiting.clear()
+            self._wakeup.notify_all()
+        for future, _, _, _ in waiting:
+            future.cancel()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,107 @@
+import io
+
+from lxml import etree
+
+# Text inside these tags is not visible text, BeautifulSoup's get_text() skips it as well
+_INVISIBLE_TAGS = {'script', 'style', 'template'}
+
+
+def _as_list(value):
+    return value if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _value_matches(expected, actual, multi_valued):
+    """Compares one attribute the way BeautifulSoup's find_all() does."""
+    if expected is True:
+        return actual is not None
+    if expected is None or expected is False:
+        return actual is None
+    if actual is None:
+        return False
+    for option in _as_list(expected):
+        if hasattr(option, 'search'): # compiled regular expression
+            if option.search(actual):
+                return True
+        elif option == actual or (multi_valued and option in actual.split()):
+            return True
+    return False
+
+
+class ElementSelector:
+    """A BeautifulSoup-style (name, attrs) selector, e.g. ('a', {'data-testid': 'header-story-title'})."""
+
+    def __init__(self, name, attrs=None):
+        self.names = None if name in (None, True) else {tag.lower() for tag in _as_list(name)}
+        self.attrs = attrs or {}
+
+    def matches(self, element):
+        if self.names is not None and element.tag not in self.names:
+            return False
+        return all(
+            _value_matches(expected, element.get(key), key == 'class')
+            for key, expected in self.attrs.items()
+        )
+
+
+def element_text(element):
+    """Visible text of an element with each piece stripped, like get_text(strip=True)."""
+    parts = []
+    stack = [element]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str): # a tail string pushed below
+            parts.append(item)
+            continue
+        if not isinstance(item.tag, str) or item.tag in _INVISIBLE_TAGS:
+            continue # comments, processing instructions, scripts
+        if item.text:
+            parts.append(item.text)
+        # Push children in reverse so they pop in document order, each followed by its tail
+        for child in reversed(item):
+            if child.tail:
+                stack.append(child.tail)
+            stack.append(child)
+    return ''.join(part.strip() for part in parts)
+
+
+def extract_elements(html, name, attrs=None, encoding=None):
+    """Streams through an HTML document and returns (text, attributes) for each matching element.
+
+    Only elements matching the selector are kept: everything else is discarded as soon
+    as the parser has finished with it, so no full document tree is ever held in memory.
+    `html` may be bytes (decoded with `encoding`, or the document's own declaration) or str.
+    Results are in document order, as with find_all().
+    """
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+        encoding = 'utf-8'
+    elif encoding:
+        encoding = encoding.replace('_', '-') # libxml2 knows IANA-style labels, not Python codec names
+    try:
+        events = etree.iterparse(io.BytesIO(html), events=('start', 'end'), html=True,
+                                 encoding=encoding, recover=True, huge_tree=True)
+    except LookupError:
+        # A charset libxml2 has no converter for (e.g. UTF-16): decode it in Python instead
+        return extract_elements(html.decode(encoding, errors='replace'), name, attrs)
+    selector = ElementSelector(name, attrs)
+    found = [] # (start order, text, attributes)
+    open_matches = [] # start order of matching elements still being parsed
+    order = 0
+    for event, element in events:
+        if event == 'start':
+            if selector.matches(element):
+                open_matches.append((order, element))
+            order += 1
+            continue
+        if open_matches and open_matches[-1][1] is element:
+            start_order, _ = open_matches.pop()
+            found.append((start_order, element_text(element), dict(element.attrib)))
+        if not open_matches:
+            # Nothing above us needs this subtree any more, free it and its finished siblings
+            element.clear(keep_tail=True)
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+    found.sort(key=lambda item: item[0])
+    return [(text, attributes) for _, text, attributes in found]
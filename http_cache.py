@@ -0,0 +1,147 @@
+import json
+import os
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
+
+
+class _NotModified:
+    """Sentinel returned when a URL has not changed since it was last fetched."""
+
+    def __repr__(self):
+        return 'NOT_MODIFIED'
+
+    def __reduce__(self):
+        # Keep the sentinel a singleton when it is pickled
+        return 'NOT_MODIFIED'
+
+
+NOT_MODIFIED = _NotModified()
+
+_MAX_AGE_RE = re.compile(r'max-age\s*=\s*(\d+)')
+
+
+def parse_max_age(cache_control):
+    """Returns the max-age in seconds from a Cache-Control header, or None."""
+    if not cache_control or 'no-cache' in cache_control or 'no-store' in cache_control:
+        return None
+    match = _MAX_AGE_RE.search(cache_control)
+    return int(match.group(1)) if match else None
+
+
+class HttpCache:
+    """Conditional-GET cache shared by the RSS and HTML fetch paths.
+
+    Remembers the ETag / Last-Modified validators of every URL in a JSON file and
+    sends them back as If-None-Match / If-Modified-Since. A 304 response, or a
+    response that is still fresh according to its Cache-Control max-age, comes back
+    as NOT_MODIFIED so the caller can skip parsing. All requests go through one
+    pooled requests.Session so connections are kept alive between fetches.
+
+    The validators of a new response are only kept once the caller has processed
+    its content and calls commit(url). Until then the URL is still checked against
+    the previous ones, so a response that failed to parse is downloaded again.
+    """
+
+    def __init__(self, path='http_cache.json', pool_size=16, headers=None):
+        self.path = path
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._pending = {} # url -> entry of a response not committed yet
+        self.stats = {'hits': 0, 'not_modified': 0, 'misses': 0, 'errors': 0, 'bytes_downloaded': 0, 'bytes_saved': 0}
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        """Writes the validators to disk (atomically, via a temporary file)."""
+        with self._lock:
+            data = json.dumps(self._entries)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def max_age(self, url):
+        """Returns the last Cache-Control max-age seen for `url`, if any."""
+        with self._lock:
+            entry = self._entries.get(url)
+        return entry.get('max_age') if entry else None
+
+    def get(self, url, timeout=10):
+        """GETs `url`, returning the response or NOT_MODIFIED.
+
+        Raises requests.exceptions.RequestException on network errors and bad status codes.
+        """
+        with self._lock:
+            entry = dict(self._entries.get(url) or {})
+
+        # Still fresh according to the server, don't even ask
+        if entry.get('fresh_until', 0) > time.time():
+            self._count('hits')
+            self._count('bytes_saved', entry.get('length', 0))
+            return NOT_MODIFIED
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=timeout)
+            if response.status_code != 304:
+                response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
+        except requests.exceptions.RequestException:
+            self._count('errors')
+            raise
+
+        max_age = parse_max_age(response.headers.get('Cache-Control'))
+        if response.status_code == 304:
+            self._count('not_modified')
+            self._count('bytes_saved', entry.get('length', 0))
+            entry['max_age'] = max_age
+            entry['fresh_until'] = time.time() + max_age if max_age else 0
+            with self._lock:
+                self._entries[url] = entry
+            return NOT_MODIFIED
+
+        self._count('misses')
+        self._count('bytes_downloaded', len(response.content))
+        with self._lock:
+            self._pending[url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'length': len(response.content),
+                'max_age': max_age,
+                'fresh_until': time.time() + max_age if max_age else 0,
+            }
+        return response
+
+    def commit(self, url):
+        """Keeps the validators of the last response for `url`, once its content was processed."""
+        with self._lock:
+            entry = self._pending.pop(url, None)
+            if entry is not None:
+                self._entries[url] = entry
+
+    def close(self):
+        self.session.close()
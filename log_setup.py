@@ -0,0 +1,82 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+LOGGER_NAME = 'monitor'
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, or as text with key=value fields appended.
+
+    Structured fields are passed as `extra={'fields': {...}}`, e.g. the site being checked.
+    """
+
+    def __init__(self, json_lines=False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None) or {}
+        if self.json_lines:
+            entry = {
+                'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+                'level': record.levelname,
+                'msg': record.getMessage(),
+                **fields,
+            }
+            if record.exc_info:
+                entry['exc'] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+        text = record.getMessage()
+        if fields:
+            text += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            text += '\n' + self.formatException(record.exc_info)
+        return text
+
+
+def _console_handler(json_lines):
+    # Replace characters the console cannot encode once here, instead of re-encoding every message
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(errors='replace')
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(StructuredFormatter(json_lines))
+    return handler
+
+
+def setup_logging(json_lines=False, level=logging.INFO):
+    """Routes the monitor's logger through a queue drained by a background thread.
+
+    Callers only pay for a queue put; formatting and console writes happen on the
+    listener thread. Returns the listener, stop() it on shutdown to flush the queue.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    logger.propagate = False
+    log_queue = queue.SimpleQueue()
+    logger.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    listener = logging.handlers.QueueListener(log_queue, _console_handler(json_lines))
+    listener.start()
+    return listener
+
+
+def setup_direct_logging(json_lines=False, level=logging.INFO):
+    """Writes log records straight to the console, without the queue.
+
+    Used by parse worker processes, which cannot reach the parent's listener thread, and
+    by anything importing the monitor's modules without calling setup_logging().
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    logger.propagate = False
+    logger.handlers[:] = [_console_handler(json_lines)]
+
+
+def get_logger():
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        setup_direct_logging()
+    return logger
@@ -1,37 +1,55 @@
-import requests  # Library for making HTTP requests
-from bs4 import BeautifulSoup  # Library for parsing HTML and XML documents
 import time  # Library for time-related tasks, like pausing execution
-import smtplib # Library for sending emails (optional, for notifications)
-from email.mime.text import MIMEText # For formatting email messages (optional)
 from dotenv import load_dotenv
 import os
 from urllib.parse import urljoin
 import sys
-import feedparser
 import json
-# --- Selenium Imports ---
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service # Or Firefox service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options # Or Firefox options
-from selenium.common.exceptions import TimeoutException, WebDriverException
+import socket
+import threading
+import multiprocessing
+from config import load_config, ConfigError
+from backends import load_backend
+from fetch_pool import FetchPool
+from http_cache import HttpCache, NOT_MODIFIED
+from snapshot_store import SnapshotStore
+from charset import CharsetResolver
+from seen_store import SeenStore
+from story_index import StoryIndex
+from matcher import KeywordMatcher
+from pipeline import Pipeline
+from watermarks import WatermarkStore, new_entries
+from polling import PollScheduler
+from cluster import LeaseStore
+from notify import NotificationDispatcher, SmtpSink, FileSink
+from metrics import METRICS, CycleProfiler
+from log_setup import setup_logging, setup_direct_logging, get_logger
+# Selenium, feedparser, lxml and smtplib are only imported once a configured site
+# (or email notifications) actually needs them, see backends/
 # --- Configuration ---
 load_dotenv()
 
-# Load NEWS_WEBSITES and KEYWORDS from config.json file
+CONFIG_FILE = os.getenv('MONITOR_CONFIG', 'config.json') # Keywords and websites to monitor
+
+# Load NEWS_WEBSITES and KEYWORDS from the config file, validated and compiled into Site objects once
 try:
-    with open('config.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        NEWS_WEBSITES = data['websites']
-        KEYWORDS = data['keywords']
+    CONFIG = load_config(CONFIG_FILE)
+    NEWS_WEBSITES = CONFIG.sites
+    KEYWORDS = CONFIG.keywords
 except FileNotFoundError:
-    print('Error: The file config.json was not found')
+    print(f'Error: The file {CONFIG_FILE} was not found')
+    sys.exit(1)
 except json.JSONDecodeError:
-    print('Error: Invalid JSON found in config.json')
-except Exception as e:
-    print("Error: {e}")
+    print(f'Error: Invalid JSON found in {CONFIG_FILE}')
+    sys.exit(1)
+except ConfigError as e:
+    print(f"Error: Invalid configuration in {CONFIG_FILE}: {e}")
+    sys.exit(1)
+
+# --- Keyword Matching Settings ---
+KEYWORD_WORD_BOUNDARIES = False # Set to True so Latin keywords only match whole words
+
+# Compiled once so every article is scanned a single time for all keywords
+KEYWORD_MATCHER = KeywordMatcher(KEYWORDS, word_boundaries=KEYWORD_WORD_BOUNDARIES)
 
 # --- Optional: Email Notification Settings ---
 SEND_EMAIL_NOTIFICATIONS = False # Set to True to enable email notifications
@@ -40,120 +58,128 @@ SMTP_PORT = 587  # Common port for TLS
 EMAIL_ADDRESS = os.getenv('EMAIL_USER') # Your email address
 EMAIL_PASSWORD = os.getenv('EMAIL_PASS') # Your email password (use app password if using Gmail)
 RECIPIENT_EMAIL = os.getenv('EMAIL_RECEPIENT') # Email address to send notifications to
+NOTIFICATION_FILE = None # Set to a path (e.g. 'alerts.log') to also append alert digests to a file
+NOTIFY_BATCH_WINDOW_SECONDS = 60 # Alerts arriving within this window are sent as one digest
+
+# --- Fetch Concurrency Settings ---
+MAX_CONCURRENT_FETCHES = 8 # Total number of sites fetched at the same time
+MAX_FETCHES_PER_HOST = 1 # Concurrent fetches allowed against a single host
+PER_HOST_DELAY_SECONDS = 5 # Minimum gap between two requests to the same host
+
+# --- Browser Pool Settings ---
+BROWSER_POOL_SIZE = 2 # Number of warm Chrome instances shared by Selenium sites
+BROWSER_MAX_PAGES = 50 # Restart a browser after it has loaded this many pages
+
+# --- Parse Stage Settings ---
+PARSE_WORKERS = os.cpu_count() or 1 # Worker processes for HTML/feed parsing and keyword matching
+MAX_PENDING_PARSES = 16 # Fetched pages allowed to wait for a parse worker before fetching pauses
+PARSE_START_METHOD = 'forkserver' # Workers are forked from a clean single-threaded server, never from the threaded monitor
+
+# --- Polling Schedule Settings ---
+# Each site is polled as often as it publishes, within these bounds
+# (a site in config.json can override them with "min_interval_seconds" / "max_interval_seconds")
+POLL_INITIAL_INTERVAL_SECONDS = 3600 # Until a site's publishing rate is known
+POLL_MIN_INTERVAL_SECONDS = 300
+POLL_MAX_INTERVAL_SECONDS = 6 * 3600
+POLL_TARGET_NEW_PER_POLL = 1 # Aim for about this many new entries between two polls
+
+# --- Cluster Settings ---
+# Several monitor processes (e.g. `docker compose up --scale monitor=3`) can split the sites
+# between them: point them all at the same cluster database and state directory, on a
+# filesystem they share on one host. Leave MONITOR_CLUSTER_DB unset to poll every site here.
+CLUSTER_DB_FILE = os.getenv('MONITOR_CLUSTER_DB') # Site leases and node heartbeats
+NODE_ID = os.getenv('MONITOR_NODE_ID') or socket.gethostname() # Must differ between nodes
+LEASE_SECONDS = 180 # A stopped node's sites are taken over by the others after this long
+CLUSTER_REBALANCE_SECONDS = 60 # How often a node rechecks which sites it owns
+SHARED_STATE_DIR = os.getenv('MONITOR_STATE_DIR', '') # Seen links and feed watermarks, shared by all nodes
+NODE_STATE_DIR = os.path.join(SHARED_STATE_DIR, 'nodes', NODE_ID) if CLUSTER_DB_FILE else '' # This node's own files
+
+# --- HTTP Cache Settings ---
+HTTP_CACHE_FILE = os.path.join(NODE_STATE_DIR, 'http_cache.json') # ETag/Last-Modified validators, kept across restarts
+
+# --- Seen Article Store Settings ---
+SEEN_DB_FILE = os.path.join(SHARED_STATE_DIR, 'seen_articles.db') # Links already alerted on, kept across restarts
+SEEN_MAX_AGE_DAYS = 30 # Forget links after this many days
+SEEN_MAX_ITEMS = 100000 # Upper bound on the number of remembered links
+
+# --- Story Clustering Settings ---
+STORY_SIMILARITY_THRESHOLD = 0.7 # Articles from different sites whose headlines overlap this much are one story...
+STORY_DESCRIPTION_THRESHOLD = 0.5 # ...if their descriptions overlap this much too, when both have one
+STORY_INDEX_MAX_ITEMS = 20000 # Upper bound on the number of remembered articles (about 3 KB of memory each)
+STORY_INDEX_MAX_AGE_DAYS = 3 # Syndicated copies of a story rarely show up later than this
+
+# --- Feed Watermark Settings ---
+FEED_STATE_DB_FILE = os.path.join(SHARED_STATE_DIR, 'feed_state.db') # Newest entry seen per feed, so each cycle only checks newer ones
+
+# --- Page Snapshot Settings ---
+SNAPSHOT_DIR = os.path.join(NODE_STATE_DIR, 'snapshots') # Compressed copies of fetched pages, for debugging selectors; None to disable
+SNAPSHOT_MAX_PER_SITE = 10 # Snapshots kept per site
+SNAPSHOT_MAX_AGE_DAYS = 7 # Older snapshots are dropped (a site's latest one is always kept)
+SNAPSHOT_MAX_MB = 200 # Upper bound on the compressed size of all snapshots
+
+# --- Metrics, Profiling and Logging Settings ---
+METRICS_PORT = 9108 # Serves /metrics (Prometheus) and /metrics.json on localhost; None to disable
+METRICS_JSON_FILE = os.path.join(NODE_STATE_DIR, 'metrics.json') # Metrics snapshot rewritten after every cycle; None to disable
+PROFILE_TRIGGER_FILE = 'profile_next_cycle' # Create this file (or send SIGUSR1) to profile the next cycle
+PROFILE_DIR = os.path.join(NODE_STATE_DIR, 'profiles') # Where cycle profiles (.prof) are saved
+LOG_JSON = False # Set to True to log one JSON object per line instead of plain text
+
+HTTP_CACHE = HttpCache(HTTP_CACHE_FILE, pool_size=MAX_CONCURRENT_FETCHES)
+
+# Written from a background thread; identical bodies are neither stored again nor parsed
+SNAPSHOTS = SnapshotStore(SNAPSHOT_DIR, SNAPSHOT_MAX_PER_SITE, SNAPSHOT_MAX_AGE_DAYS, SNAPSHOT_MAX_MB * 1024 * 1024) if SNAPSHOT_DIR else None
+
+# Charset of each page, found from its BOM, header or <meta> tag, or detected once per site
+CHARSETS = CharsetResolver()
+
+# Whatever a fetch backend may need to set itself up, see Backend.from_settings()
+BACKEND_SETTINGS = {
+    'http_cache': HTTP_CACHE,
+    'browser_pool_size': BROWSER_POOL_SIZE,
+    'browser_max_pages': BROWSER_MAX_PAGES,
+}
+BACKENDS = {} # backend name -> instance, created on first use
+_BACKENDS_LOCK = threading.Lock()
 
 # --- Helper Functions ---
 
-def safe_print(text):
-    """Prints text safely, replacing characters incompatible with the console."""
-    try:
-        encoded_text = text.encode(sys.stdout.encoding, errors='replace').decode(sys.stdout.encoding)
-        print(encoded_text)
-    except Exception as e:
-        print(f"Error printing message: {e}")
-        print(repr(text))
-
-def fetch_html_without_selenium(url):
-     """Fetches HTML content from a given URL."""
-     try:
-         # Send an HTTP GET request to the URL
-         # Include a User-Agent header to mimic a browser visit
-         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
-         response = requests.get(url, headers=headers, timeout=10) # Added timeout
-         response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-         return response.text
-     except requests.exceptions.RequestException as e:
-         print(f"Error fetching {url}: {e}")
-         return None
-     
-def fetch_html_with_selenium(url, site_name, selenium_selector_str):
-    """Fetches dynamically loaded HTML content from a given URL using Selenium."""
-    driver = None # Initialize driver to None
-    html_content = None # Initialize html_content
-    # Define a filename for saving the source code
-    source_filename = f"{site_name}_source.html"
-    try:
-        # Setup Chrome options (headless recommended for background execution)
-        chrome_options = Options()
-        chrome_options.add_argument("--headless") # Run without opening a browser window
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36") # Set user agent
-
-        # Initialize WebDriver (assuming chromedriver is in PATH)
-        # If not in PATH, use: driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.implicitly_wait(5) # Basic implicit wait
-
-        safe_print(f"Loading URL with Selenium: {url}")
-        driver.get(url)
-
-        wait_timeout = 25 # Increased timeout slightly
-        wait_selector_str = selenium_selector_str # Wait for any link inside the likely container
-        wait_selector = (By.CSS_SELECTOR, wait_selector_str)
-
-        safe_print(f"Waiting up to {wait_timeout}s for element '{wait_selector_str}' to load...")
-        WebDriverWait(driver, wait_timeout).until(
-            EC.presence_of_element_located(wait_selector)
-            # Alternative: Wait for visibility if presence isn't enough
-            # EC.visibility_of_element_located(wait_selector)
-        )
-        safe_print("Element found, page likely loaded.")
-
-        # Optional: Add a small extra sleep just in case more JS needs to run
-        time.sleep(5)
-
-        # Get the page source *after* JavaScript has potentially run
-        html_content = driver.page_source
-        safe_print(f"Successfully fetched HTML for {url}")
-
-        # --- Save the fetched HTML for debugging ---
-        try:
-            with open(source_filename, "w", encoding="utf-8") as f:
-                f.write(html_content)
-            safe_print(f"Saved fetched HTML source to '{source_filename}'")
-        except Exception as save_e:
-            safe_print(f"Could not save HTML source to file: {save_e}")
-        # --- End Save HTML ---
-
-        return html_content
-
-    except TimeoutException:
-        safe_print(f"Error: Timed out waiting for element '{wait_selector_str}' on {url}. Page might not have loaded correctly or selector is wrong.")
-        # Try to get and save page source even on timeout for debugging
-        if driver:
-             try:
-                 html_content = driver.page_source
-                 with open(source_filename, "w", encoding="utf-8") as f:
-                     f.write(html_content if html_content else "")
-                 safe_print(f"Saved HTML source (on timeout) to '{source_filename}' - PLEASE INSPECT THIS FILE.")
-                 return html_content # Return potentially incomplete HTML
-             except Exception as save_e:
-                 safe_print(f"Could not save HTML source to file after timeout: {save_e}")
-        return None # Indicate failure
-    except WebDriverException as e:
-        safe_print(f"Error during Selenium fetch for {url}: {e}")
-        return None
-    except Exception as e:
-        safe_print(f"An unexpected error occurred during Selenium fetch for {url}: {e}")
-        return None
-    finally:
-        # Ensure the browser is closed even if errors occur
-        if driver:
-            safe_print("Closing Selenium browser.")
-            driver.quit()
+def safe_print(text, **fields):
+    """Logs a message through the monitor's logger, with optional structured fields (e.g. site=...).
+
+    Characters the console cannot encode are replaced by the log handler.
+    """
+    get_logger().info(text, extra={'fields': fields})
+
+def get_backend(name):
+    """Returns the fetch backend called `name`, importing and creating it on first use."""
+    with _BACKENDS_LOCK:
+        backend = BACKENDS.get(name)
+        if backend is None:
+            backend = BACKENDS[name] = load_backend(name).from_settings(BACKEND_SETTINGS)
+        return backend
+
+def bind_backends(sites):
+    """Gives every site its fetch backend; only the backends these sites use get imported."""
+    for site in sites:
+        site.fetcher = get_backend(site.backend)
 
 
-def parse_news(html_content, base_url,soup_ele,soup_identifier):
-    """Parses HTML (potentially rendered by JS) to find news headlines and links."""
+def parse_news(html_content, base_url,soup_ele,soup_identifier, encoding=None):
+    """Parses HTML (potentially rendered by JS) to find news headlines and links.
+
+    `html_content` may be a str or raw bytes; bytes are decoded with `encoding`, or the
+    charset the page declares itself.
+    """
     found_articles = {}
     if not html_content:
         safe_print("parse_news received no HTML content.")
         return found_articles
 
+    from html_extract import extract_elements # lxml is only loaded by processes that parse pages
+
     try:
-        soup = BeautifulSoup(html_content, 'lxml')
-        headline_tags = soup.find_all(soup_ele, soup_identifier) 
+        # Stream through the page keeping only the tags matching the selector (same rules as find_all)
+        headline_tags = extract_elements(html_content, soup_ele, soup_identifier, encoding=encoding)
 
         safe_print(f"Found {len(headline_tags)} potential headline tags.")
 
@@ -161,11 +187,9 @@ def parse_news(html_content, base_url,soup_ele,soup_identifier):
              safe_print("Selector did not find any headline tags. Please check the selector and the saved HTML source.")
 
         # Assuming the selector finds the <a> tags directly:
-        for link_tag in headline_tags:
-             headline_text = link_tag.get_text(strip=True)
-
-             if headline_text and link_tag.has_attr('href'):
-                 link_href = link_tag['href']
+        for headline_text, link_attrs in headline_tags:
+             if headline_text and 'href' in link_attrs:
+                 link_href = link_attrs['href']
                  # Handle relative URLs
                  if link_href.startswith('/'):
                      link_href = urljoin(base_url, link_href)
@@ -187,128 +211,384 @@ def parse_news(html_content, base_url,soup_ele,soup_identifier):
     return found_articles
 
 def parse_rss(FEED_URL):
-    print(f"Fetching and parsing feed from: {FEED_URL}")
-    # The parse() function downloads and parses the feed content.
-    feed = feedparser.parse(FEED_URL)
+    """Fetches and parses a feed in one go."""
+    fetched = get_backend('rss').fetch_url(FEED_URL)
+    if fetched is None:
+        return {}
+    if fetched is NOT_MODIFIED:
+        return NOT_MODIFIED
+    found_articles, _, _ = parse_feed(fetched['body'], fetched['headers'])
+    return found_articles
+
+def parse_feed(content, response_headers, watermark=None):
+    """Parses raw feed bytes into {headline: [link, description]}.
+
+    Only entries newer than `watermark` are returned (all entries without one).
+    Returns (found_articles, watermark for the next cycle, the feed's <ttl> in seconds);
+    the watermark is None when the feed had no entries.
+    """
+    import feedparser # Only loaded by processes that parse feeds
 
     found_articles = {}
+    next_watermark = None
+    # The parse() function parses the downloaded feed content.
+    feed = feedparser.parse(content, response_headers=response_headers)
+
     # --- Check for Errors ---
     # feedparser sets feed.bozo to 1 if potential problems were encountered during parsing
     if feed.bozo:
-        print(f"Warning: Potential feed parsing issue detected. Bozo flag is set.")
+        safe_print(f"Warning: Potential feed parsing issue detected. Bozo flag is set.")
         # You might want to inspect the bozo_exception for details
         if hasattr(feed, 'bozo_exception'):
-            print(f"Bozo Exception: {feed.bozo_exception}")
+            safe_print(f"Bozo Exception: {feed.bozo_exception}")
 
     # --- Access Feed Entries (Items) ---
     # feed.entries is a list of dictionaries, each representing an item/article
     if not feed.entries:
-        print("No entries found in the feed.")
+        safe_print("No entries found in the feed.")
     else:
-        print(f"Found {len(feed.entries)} entries:\n")
-        # Loop through the first 5 entries (or all if fewer than 5)
-        for entry in feed.entries[:5]:
+        # Skip everything up to the last watermark, however many new entries there are
+        entries, next_watermark = new_entries(feed.entries, watermark)
+        safe_print(f"Found {len(feed.entries)} entries, {len(entries)} new:\n")
+        for entry in entries:
             headline = entry.get('title', 'N/A') # Use .get() for safe access
             link = entry.get('link', 'N/A')
             description = entry.get('description', 'N/A')
 
             found_articles[headline] = [link,description]
-    return found_articles
+    ttl = feed.feed.get('ttl', '')
+    ttl_seconds = int(ttl) * 60 if str(ttl).strip().isdigit() else None # RSS ttl is in minutes
+    return found_articles, next_watermark, ttl_seconds
 
-# (check_keywords and send_email functions remain the same)
 def check_keywords(articles, keywords):
-    """Checks if article headlines contain any of the specified keywords."""
+    """Checks if article headlines or descriptions contain any of the specified keywords.
+
+    `keywords` is either a KeywordMatcher or a plain list of keywords.
+    """
+    matcher = keywords if isinstance(keywords, KeywordMatcher) else KeywordMatcher(keywords)
     relevant_articles = {}
     for headline, item in articles.items():
         link = item[0]
         description = item[1]
-        # Check if any keyword (case-insensitive) is in the headline
-        matched_keywords = [keyword for keyword in keywords 
-                    if keyword.lower() in headline.lower() or keyword.lower() in description.lower()]
+        # Check if any keyword (case-insensitive) is in the headline or description
+        matched_keywords = matcher.match(headline, description)
         if matched_keywords:
            relevant_articles[headline] = [link,matched_keywords,description] 
     return relevant_articles
 
-def send_email(subject, body):
-    """Sends an email notification (if enabled)."""
-    if not SEND_EMAIL_NOTIFICATIONS:
-        return
-    msg = MIMEText(body, _charset='utf-8')
-    msg['Subject'] = subject
-    msg['From'] = EMAIL_ADDRESS
-    msg['To'] = RECIPIENT_EMAIL
-    try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            server.sendmail(EMAIL_ADDRESS, RECIPIENT_EMAIL, msg.as_string().encode('utf-8'))
-        safe_print("Notification email sent successfully.")
-    except smtplib.SMTPAuthenticationError:
-        safe_print("Email login failed. Check credentials or app password settings.")
-    except Exception as e:
-        safe_print(f"Failed to send email: {e}")
-
+def create_notifier():
+    """Starts the background dispatcher with every enabled notification sink."""
+    sinks = []
+    if SEND_EMAIL_NOTIFICATIONS:
+        sinks.append(SmtpSink(SMTP_SERVER, SMTP_PORT, EMAIL_ADDRESS, EMAIL_PASSWORD, EMAIL_ADDRESS, RECIPIENT_EMAIL))
+    if NOTIFICATION_FILE:
+        sinks.append(FileSink(NOTIFICATION_FILE))
+    return NotificationDispatcher(sinks, batch_window=NOTIFY_BATCH_WINDOW_SECONDS, log=safe_print)
+
+
+def resolve_charset(site, fetched):
+    """Adds the charset of a fetched page to its payload, so the parser decodes the raw bytes directly."""
+    fetched['charset'], source = CHARSETS.resolve(site.name, fetched['body'], fetched['headers'])
+    METRICS.inc('charset_resolved_total', source=source, site=site.name)
+    return fetched
+
+def fetch_site(job):
+    """Fetch stage: downloads one site's feed or page as raw bytes with the site's backend (RSS, HTTP or Selenium).
+
+    Returns NOT_MODIFIED when the content is unchanged since the last check.
+    """
+    site = job['site']
+    safe_print(f"Checking {site.name} ({site.url})...", site=site.name)
+    with METRICS.timer('fetch_seconds', site=site.name):
+        fetched = site.fetcher.fetch(site)
+    if fetched is None or fetched is NOT_MODIFIED:
+        return fetched
+
+    # Same bytes as the last snapshot: nothing new to parse (covers servers without validators)
+    if SNAPSHOTS is not None:
+        _, changed = SNAPSHOTS.record(site.name, fetched['body'])
+        if not changed:
+            METRICS.inc('snapshots_unchanged_total', site=site.name)
+            return NOT_MODIFIED
+    if not site.is_feed: # feedparser reads the XML declaration itself
+        resolve_charset(site, fetched)
+    return fetched
+
+def parse_site(job, fetched):
+    """Parse/match stage: extracts articles from a fetched payload and checks them for keywords.
+
+    Only articles newer than the site's watermark are checked. Runs in a parse worker
+    process. Returns None when nothing could be parsed, otherwise a dict with the
+    check_keywords() result, the next watermark, the number of new articles, the
+    feed's ttl hint in seconds and how long parsing and matching took (recorded into
+    the metrics by the main process, which owns them).
+    """
+    site = job['site']
+    ttl_seconds = None
+    parse_started = time.perf_counter()
+    if site.is_feed:
+        articles, watermark, ttl_seconds = parse_feed(fetched['body'], fetched['headers'], job['watermark'])
+        if watermark is None:
+            return None
+    else:
+        articles = parse_news(fetched['body'], site.url, site.selector_tag, site.selector_attrs,
+                              encoding=fetched.get('charset'))
+        if not articles:
+            return None
+        # Scraped pages have no guids, use the article links as entry ids
+        fresh, watermark = new_entries([{'link': item[0]} for item in articles.values()], job['watermark'])
+        fresh_links = {entry['link'] for entry in fresh}
+        articles = {headline: item for headline, item in articles.items() if item[0] in fresh_links}
+    match_started = time.perf_counter()
+    relevant = check_keywords(articles, KEYWORD_MATCHER)
+    return {
+        'relevant': relevant,
+        'watermark': watermark,
+        'new_entries': len(articles),
+        'ttl_seconds': ttl_seconds,
+        'timings': {'parse_seconds': match_started - parse_started, 'match_seconds': time.perf_counter() - match_started},
+    }
+
+def record_cycle_metrics(pipeline, stories):
+    """Copies queue depths and cache/snapshot/charset/story/browser pool counters into the metrics gauges."""
+    for stage, stats in pipeline.stats().items():
+        for key in ('queued', 'active', 'pending', 'peak_queued', 'peak_pending', 'completed', 'errors'):
+            if key in stats: # The parse stage only knows its pending jobs, not which are running
+                METRICS.set(f'pipeline_{key}', stats[key], stage=stage)
+    METRICS.set('parse_pool_restarts', pipeline.pool_restarts)
+    for key, value in HTTP_CACHE.stats.items():
+        METRICS.set(f'http_cache_{key}', value)
+    for key, value in CHARSETS.stats.items():
+        METRICS.set(f'charset_{key}', value)
+    if SNAPSHOTS is not None:
+        for key, value in SNAPSHOTS.stats.items():
+            METRICS.set(f'snapshots_{key}', value)
+    for key, value in stories.stats.items():
+        METRICS.set(f'story_index_{key}', value)
+    METRICS.set('story_index_items', len(stories))
+    if 'selenium' in BACKENDS:
+        pool_stats = BACKENDS['selenium'].stats()
+        for key in ('live', 'idle', 'retired'):
+            METRICS.set(f'browser_pool_{key}', pool_stats[key])
+
+def update_ownership(leases, scheduler, sites_by_url):
+    """Schedules the sites this node holds leases on and stops scheduling the ones it gave up."""
+    owned = leases.claim(sites_by_url, time.time())
+    gained = owned - scheduler.sites.keys()
+    lost = scheduler.sites.keys() - owned
+    for url in gained: # Due right away, the previous owner kept its own schedule
+        website = sites_by_url[url]
+        scheduler.add(url, time.time(), website.min_interval, website.max_interval)
+    for url in lost:
+        scheduler.remove(url)
+    if gained or lost:
+        safe_print(f"Node {NODE_ID} now polls {len(owned)} of {len(sites_by_url)} sites "
+                   f"({len(leases.live_nodes())} live node(s), {len(gained)} gained, {len(lost)} handed over).")
+    METRICS.set('cluster_owned_sites', len(owned))
+    return owned
+
+def next_wait_seconds(scheduler, leases):
+    """Seconds until the next site is due; in a cluster, never longer than the rebalance interval."""
+    next_due = scheduler.next_due()
+    wait_seconds = max(next_due - time.time(), 0) if next_due is not None else POLL_MAX_INTERVAL_SECONDS
+    if leases is not None:
+        wait_seconds = min(wait_seconds, CLUSTER_REBALANCE_SECONDS)
+    return wait_seconds
+
+def run_cycle(due_sites, pipeline, scheduler, feed_watermarks, previously_found, stories, notifier):
+    """One monitoring cycle over the sites that are due.
+
+    Fetches them concurrently, parses and searches them for keywords in the worker
+    processes, and handles each site as soon as it finishes: reschedules it, moves its
+    watermark, and alerts on matching articles that were not seen before. Returns the
+    cycle's counts of sites checked, sites that failed, new entries and alerts.
+    """
+    counts = {'sites': len(due_sites), 'failed': 0, 'new_entries': 0, 'alerts': 0}
+    # Each job carries the site's watermark so the parse workers only look at newer entries
+    jobs = [{'site': website, 'url': website.url, 'watermark': feed_watermarks.get(website.url)}
+            for website in due_sites]
+    for job, result, error in pipeline.run(jobs, fetch_site, parse_site):
+        website = job['site']
+        if error is not None:
+            safe_print(f"Error checking {website.name}: {error}", site=website.name)
+            METRICS.inc('errors_total', stage='pipeline', site=website.name)
+            result = None
+        elif result is None:
+            METRICS.inc('errors_total', stage='fetch', site=website.name)
+        elif result is not NOT_MODIFIED:
+            # Parsed fine: only now may the next fetch be skipped when nothing changed
+            HTTP_CACHE.commit(website.url)
+            if SNAPSHOTS is not None:
+                SNAPSHOTS.accept(website.name)
+
+        # Tell the scheduler what this poll found so it can pick the next poll time
+        hint_seconds = HTTP_CACHE.max_age(website.url)
+        if result is NOT_MODIFIED or result is None:
+            scheduler.record(website.url, time.time(), 0 if result is NOT_MODIFIED else None,
+                             failed=result is None, hint_seconds=hint_seconds)
+        else:
+            hint_seconds = max(hint_seconds or 0, result['ttl_seconds'] or 0)
+            # The first poll of a site has no watermark, so all of its entries look new
+            new_entries_seen = result['new_entries'] if job['watermark'] is not None else None
+            scheduler.record(website.url, time.time(), new_entries_seen, hint_seconds=hint_seconds)
+
+        if result is NOT_MODIFIED:
+            safe_print(f"{website.name} has not changed since the last check, skipping.")
+            continue
+
+        if result is not None:
+            counts['new_entries'] += result['new_entries']
+            for name, seconds in result['timings'].items():
+                METRICS.observe(name, seconds, site=website.name)
+            METRICS.inc('articles_parsed_total', result['new_entries'], site=website.name)
+            feed_watermarks.set(website.url, result['watermark'])
+            relevant_articles = result['relevant']
+            METRICS.inc('articles_matched_total', len(relevant_articles), site=website.name)
+            newly_found = {}
+            with METRICS.timer('dedup_seconds', site=website.name):
+                for headline, item in relevant_articles.items():
+                    article_id = item[0] # Use link as the unique ID
+                    if previously_found.add(article_id): # False if the link was already seen
+                        newly_found[headline] = [item[0],item[1],item[2]]
+            METRICS.inc('alerts_total', len(newly_found), site=website.name)
+            counts['alerts'] += len(newly_found)
+
+            if newly_found:
+                safe_print(f"Found {len(newly_found)} new relevant article(s) on {website.name}:")
+                for headline, item in newly_found.items():
+                    with METRICS.timer('story_index_seconds'):
+                        story_id, new_story = stories.add(website.name, headline, item[2])
+                    safe_print(f"  - Headline: {headline}")
+                    safe_print(f"    Link: {item[0]}")
+                    safe_print(f"    Matched Keywords: {item[1]}")
+                    safe_print(f"    Description: {item[2]}")
+                    if not new_story:
+                        METRICS.inc('stories_collapsed_total', site=website.name)
+                        safe_print(f"    Same story as an earlier article (story {story_id}), alerted on under that story.")
+                    # Queued for the background dispatcher, delivery never blocks this loop
+                    notifier.submit(website.name, headline, item[0], item[1], item[2], story=story_id)
+            else:
+                safe_print(f"No new relevant articles found on {website.name}.")
+        else:
+            counts['failed'] += 1
+            safe_print(f"Failed to fetch HTML for {website.name}.")
+
+    evicted = previously_found.evict()
+    if evicted:
+        safe_print(f"Forgot {evicted} old article link(s).")
+    return counts
 
 # --- Main Monitoring Loop ---
 
 if __name__ == "__main__":
+    log_listener = setup_logging(json_lines=LOG_JSON)
     safe_print("Starting news monitor ...")
-    previously_found = set() # Using links to track previously found articles
+    for state_dir in (SHARED_STATE_DIR, NODE_STATE_DIR):
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+    # Links (normalized, tracking params stripped) of articles we already alerted on
+    previously_found = SeenStore(SEEN_DB_FILE, SEEN_MAX_AGE_DAYS, SEEN_MAX_ITEMS)
+    feed_watermarks = WatermarkStore(FEED_STATE_DB_FILE)
+    # Near-duplicate headlines across sites (syndicated stories) share one alert entry
+    stories = StoryIndex(STORY_SIMILARITY_THRESHOLD, STORY_DESCRIPTION_THRESHOLD, max_items=STORY_INDEX_MAX_ITEMS,
+                         max_age_days=STORY_INDEX_MAX_AGE_DAYS)
+    notifier = create_notifier()
+    sites_by_url = {website.url: website for website in NEWS_WEBSITES}
+    scheduler = PollScheduler(POLL_MIN_INTERVAL_SECONDS, POLL_MAX_INTERVAL_SECONDS,
+                              POLL_INITIAL_INTERVAL_SECONDS, POLL_TARGET_NEW_PER_POLL)
+    leases = None
+    if CLUSTER_DB_FILE:
+        # Sites are scheduled as this node wins their leases, see update_ownership()
+        leases = LeaseStore(CLUSTER_DB_FILE, NODE_ID, LEASE_SECONDS)
+        safe_print(f"Running as cluster node {NODE_ID} ({CLUSTER_DB_FILE}).")
+    else:
+        for website in NEWS_WEBSITES: # Every site is due right away on startup
+            scheduler.add(website.url, time.time(), website.min_interval, website.max_interval)
+    fetch_pool = FetchPool(MAX_CONCURRENT_FETCHES, MAX_FETCHES_PER_HOST, PER_HOST_DELAY_SECONDS)
+    # Workers cannot reach the logging listener thread, so they log directly
+    pipeline = Pipeline(fetch_pool, PARSE_WORKERS, MAX_PENDING_PARSES,
+                        initializer=setup_direct_logging, initargs=(LOG_JSON,),
+                        mp_context=multiprocessing.get_context(PARSE_START_METHOD))
+    pipeline.start()
+    bind_backends(NEWS_WEBSITES)
+    safe_print(f"Fetch backends in use: {', '.join(sorted(BACKENDS))}")
+    if 'selenium' in BACKENDS:
+        safe_print("Starting Selenium browser pool...")
+        try:
+            BACKENDS['selenium'].prewarm()
+        except Exception as e:
+            safe_print(f"Could not start Selenium browsers, they will be started on demand: {e}")
+    if METRICS_PORT:
+        try:
+            METRICS.serve(METRICS_PORT)
+            safe_print(f"Serving metrics on http://127.0.0.1:{METRICS_PORT}/metrics")
+        except OSError as e:
+            safe_print(f"Could not serve metrics on port {METRICS_PORT}: {e}")
+    profiler = CycleProfiler(PROFILE_TRIGGER_FILE, PROFILE_DIR)
 
     try:
+        if leases is not None:
+            leases.start_heartbeat() # Keeps the leases alive however long a cycle takes
         while True:
+            if leases is not None:
+                update_ownership(leases, scheduler, sites_by_url)
+            due_urls = scheduler.pop_due(time.time())
+            if not due_urls: # Only woke up to check site ownership
+                time.sleep(next_wait_seconds(scheduler, leases))
+                continue
+
             current_time_str = time.strftime("%Y-%m-%d %H:%M:%S")
             safe_print(f"\n--- Checking for news at {current_time_str} ---")
-            all_relevant_articles_this_run = {}
-
-            for website in NEWS_WEBSITES:
-                safe_print(f"Checking {website['name']} ({website['url']})...")
-
-                # Retrieve articles either using RSS or webscraping from HTML             
-                if website['rss']:
-                    articles = parse_rss(website['url'])
-                else:
-                    html = fetch_html_with_selenium(website['url'], website['name'],website['selenium_selector_str']) if website['selenium'] else fetch_html_without_selenium(website['url'])
-                    articles = parse_news(html, website['url'],website['soup_selector_ele'],website['soup_selector_identifier'])
-                # Search articles for any keywords
-                if articles:   
-                    relevant_articles = check_keywords(articles, KEYWORDS)
-                    newly_found = {}
-                    for headline, item in relevant_articles.items():
-                        article_id = item[0] # Use link as the unique ID
-                        if article_id not in previously_found:
-                            newly_found[headline] = [item[0],item[1],item[2]]
-                            previously_found.add(article_id) # Add link to seen set
-
-                    if newly_found:
-                        safe_print(f"Found {len(newly_found)} new relevant article(s) on {website['name']}:")
-                        for headline, item in newly_found.items():
-                            safe_print(f"  - Headline: {headline}")
-                            safe_print(f"    Link: {item[0]}")
-                            safe_print(f"    Matched Keywords: {item[1]}")
-                            safe_print(f"    Description: {item[2]}")
-                        all_relevant_articles_this_run.update(newly_found)
-                    else:
-                        safe_print(f"No new relevant articles found on {website['name']}.")
-                else:
-                    safe_print(f"Failed to fetch HTML for {website['name']}.")
-
-                # Add a delay between checking different sites
-                safe_print(f"Waiting a few seconds before checking next site...")
-                time.sleep(5) # Increased sleep time as Selenium is more resource-intensive
-
-            # --- Notification ---
-            if all_relevant_articles_this_run:
-                email_subject = "News Monitor Alert: New Relevant Articles Found!"
-                email_body = f"Found the following new articles matching your keywords ({current_time_str}):\n\n"
-                for headline, link in all_relevant_articles_this_run.items():
-                    email_body += f"- {headline}\n  Link: {link}\n\n"
-                send_email(email_subject, email_body)
-
-            # --- Wait before next check ---
-            check_interval_seconds = 3600 # Check every hour
-            safe_print(f"\nWaiting for {check_interval_seconds // 60} minutes before next check...")
-            time.sleep(check_interval_seconds)
+
+            with profiler.cycle():
+                # Fetch, parse and match the due sites concurrently, handling each as soon as it finishes
+                run_cycle([sites_by_url[url] for url in due_urls], pipeline, scheduler,
+                          feed_watermarks, previously_found, stories, notifier)
+
+            if profiler.report:
+                safe_print(profiler.report)
+
+            stage_stats = pipeline.stats()
+            for stage in ('fetch', 'parse'):
+                stats = stage_stats[stage]
+                peak = f"peak queue {stats['peak_queued']}" if 'peak_queued' in stats else f"peak pending {stats['peak_pending']}"
+                safe_print(f"{stage.capitalize()} stage: {stats['completed']} done, {stats['errors']} errors, "
+                           f"{peak}, p50 {stats['latency_p50']:.2f}s, "
+                           f"p95 {stats['latency_p95']:.2f}s, p95 wait {stats['wait_p95']:.2f}s")
+            if pipeline.pool_restarts:
+                safe_print(f"Parse pool restarted {pipeline.pool_restarts} time(s) after a worker died.")
+
+            cache_stats = HTTP_CACHE.stats
+            safe_print(f"HTTP cache: {cache_stats['hits']} fresh hits, {cache_stats['not_modified']} not modified, {cache_stats['misses']} misses, {cache_stats['errors']} errors, {cache_stats['bytes_saved'] // 1024} KB saved")
+            try:
+                HTTP_CACHE.save()
+            except OSError as e:
+                safe_print(f"Could not save HTTP cache: {e}")
+
+            if SNAPSHOTS is not None:
+                snapshot_stats = SNAPSHOTS.stats
+                safe_print(f"Snapshots: {snapshot_stats['written']} written ({snapshot_stats['bytes_stored'] // 1024} KB of {snapshot_stats['bytes_raw'] // 1024} KB), {snapshot_stats['unchanged']} unchanged, {snapshot_stats['pruned']} pruned, {snapshot_stats['errors']} errors")
+
+            story_stats = stories.stats
+            safe_print(f"Stories: {len(stories)} articles indexed, {story_stats['collapsed']} collapsed into earlier stories, {notifier.stats['follow_ups']} alerts sent as follow-ups of earlier stories")
+
+            pool_stats = BACKENDS['selenium'].stats() if 'selenium' in BACKENDS else {'live': 0, 'retired': 0}
+            if pool_stats['live'] or pool_stats['retired']:
+                safe_print(f"Browser pool: {pool_stats['live']} live, {pool_stats['retired']} retired")
+                for driver_stats in pool_stats['drivers']:
+                    safe_print(f"  - Browser {driver_stats['id']}: {driver_stats['pages']} pages, {driver_stats['errors']} errors, {driver_stats['busy_seconds']}s busy")
+
+            record_cycle_metrics(pipeline, stories)
+            if METRICS_JSON_FILE:
+                try:
+                    METRICS.dump_json(METRICS_JSON_FILE)
+                except OSError as e:
+                    safe_print(f"Could not write metrics to '{METRICS_JSON_FILE}': {e}")
+
+            # --- Wait until the next site is due ---
+            wait_seconds = next_wait_seconds(scheduler, leases)
+            safe_print(f"\nWaiting for {wait_seconds / 60:.0f} minutes before next check...")
+            time.sleep(wait_seconds)
 
     except KeyboardInterrupt:
         safe_print("\nStopping news monitor.")
@@ -319,4 +599,18 @@ if __name__ == "__main__":
         safe_print("Traceback:")
         safe_print(traceback.format_exc())
         safe_print("------------------------")
+    finally:
+        if leases is not None:
+            leases.close() # Hands this node's sites to the others right away
+        fetch_pool.shutdown(wait=False)
+        pipeline.shutdown(wait=False)
+        for backend in BACKENDS.values():
+            backend.close()
+        HTTP_CACHE.close()
+        if SNAPSHOTS is not None:
+            SNAPSHOTS.close() # Finishes pending snapshot writes
+        previously_found.close()
+        feed_watermarks.close()
+        notifier.close() # Sends anything still queued
+        log_listener.stop() # Flushes queued log records
 
@@ -0,0 +1,107 @@
+import unicodedata
+
+
+def normalize_text(text):
+    """Folds text for matching: NFKC (full-width -> ASCII forms) followed by Unicode casefolding."""
+    return unicodedata.normalize('NFKC', text).casefold()
+
+
+def is_cjk(char):
+    """True for Chinese/Japanese/Korean characters, which are written without spaces between words."""
+    code = ord(char)
+    return (
+        0x3040 <= code <= 0x30FF      # Hiragana, Katakana
+        or 0x3400 <= code <= 0x4DBF   # CJK Extension A
+        or 0x4E00 <= code <= 0x9FFF   # CJK Unified Ideographs
+        or 0xAC00 <= code <= 0xD7AF   # Hangul syllables
+        or 0xF900 <= code <= 0xFAFF   # CJK Compatibility Ideographs
+        or 0x20000 <= code <= 0x2FA1F # CJK Extensions B-F, Compatibility Supplement
+    )
+
+
+def _is_word_char(char):
+    # CJK characters count as a boundary next to Latin keywords ("Hertz汽车" matches "Hertz")
+    return (char.isalnum() or char == '_') and not is_cjk(char)
+
+
+class KeywordMatcher:
+    """Matches a fixed keyword list against text in a single pass (Aho-Corasick automaton).
+
+    Keywords and text are both folded with normalize_text(), so matching is
+    case-insensitive and full-width/half-width agnostic. With `word_boundaries`, keywords
+    that contain no CJK characters only match as whole words; CJK keywords always match
+    as substrings since CJK text has no word separators.
+    """
+
+    def __init__(self, keywords, word_boundaries=False):
+        self.keywords = list(keywords)
+        self.word_boundaries = word_boundaries
+        # Trie stored as parallel lists indexed by state number; state 0 is the root
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]] # state -> [(keyword index, folded length, needs boundary check)]
+        for index, keyword in enumerate(self.keywords):
+            folded = normalize_text(keyword)
+            if not folded:
+                continue
+            check_boundaries = word_boundaries and not any(is_cjk(char) for char in folded)
+            state = 0
+            for char in folded:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append((index, len(folded), check_boundaries))
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        # Breadth-first so every state's failure target is finished before its children
+        queue = list(self._goto[0].values())
+        position = 0
+        while position < len(queue):
+            state = queue[position]
+            position += 1
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def _scan(self, text, found):
+        goto, fail, out = self._goto, self._fail, self._out
+        remaining = len(self.keywords) - len(found)
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not out[state]:
+                continue
+            for index, length, check_boundaries in out[state]:
+                if index in found:
+                    continue
+                if check_boundaries:
+                    start = position - length + 1
+                    if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]):
+                        continue
+                    end = position + 1
+                    if end < len(text) and _is_word_char(text[end]) and _is_word_char(text[position]):
+                        continue
+                found.add(index)
+                remaining -= 1
+                if not remaining:
+                    return
+
+    def match(self, *texts):
+        """Returns the keywords found in any of `texts`, in the order of the keyword list."""
+        found = set()
+        for text in texts:
+            if text:
+                self._scan(normalize_text(text), found)
+        return [self.keywords[index] for index in sorted(found)]
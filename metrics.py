@@ -0,0 +1,212 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+class Metrics:
+    """Thread-safe counters, gauges and latency histograms with labels (e.g. site="Google News").
+
+    Cheap enough for the hot path: every update is a dict operation under one lock.
+    Exposed in the Prometheus text format by serve(), or as JSON by dump_json().
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {} # (name, labels) -> value
+        self._gauges = {} # (name, labels) -> value
+        self._histograms = {} # (name, labels) -> [bucket counts..., sum, count]
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[index] += 1
+                    break
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Times the block into histogram `name`; an exception also counts toward errors_total."""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc('errors_total', stage=name, **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        """All current values as plain data, e.g. for dumping to JSON."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+        data = {'counters': [], 'gauges': [], 'histograms': []}
+        for (name, labels), value in sorted(counters.items()):
+            data['counters'].append({'name': name, 'labels': dict(labels), 'value': value})
+        for (name, labels), value in sorted(gauges.items()):
+            data['gauges'].append({'name': name, 'labels': dict(labels), 'value': value})
+        for (name, labels), histogram in sorted(histograms.items()):
+            data['histograms'].append({
+                'name': name,
+                'labels': dict(labels),
+                'count': histogram[-1],
+                'sum': histogram[-2],
+                'buckets': dict(zip((str(bound) for bound in self.buckets), histogram[:len(self.buckets)])),
+            })
+        return data
+
+    def prometheus_text(self):
+        """Renders every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted((key, list(value)) for key, value in self._histograms.items())
+        lines = []
+        typed = set()
+        for kind, items in (('counter', counters), ('gauge', gauges)):
+            for (name, labels), value in items:
+                if name not in typed:
+                    lines.append(f"# TYPE {name} {kind}")
+                    typed.add(name)
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram[-1]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram[-2]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram[-1]}")
+        return '\n'.join(lines) + '\n'
+
+    def dump_json(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serves /metrics (Prometheus text) and /metrics.json from a background thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = metrics.prometheus_text().encode('utf-8'), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = json.dumps(metrics.snapshot(), ensure_ascii=False).encode('utf-8'), 'application/json'
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        return server
+
+
+# Shared registry for the whole monitor
+METRICS = Metrics()
+
+
+class CycleProfiler:
+    """Runs cProfile over a single monitoring cycle when asked to.
+
+    Ask by sending SIGUSR1 to the process or by creating `trigger_file`; the next cycle
+    is profiled, its stats saved under `output_dir` and the top entries returned as text.
+    Only the main thread is profiled (result handling, dedup, scheduling); time spent in
+    fetch threads and parse worker processes shows up as waits.
+    """
+
+    def __init__(self, trigger_file='profile_next_cycle', output_dir='profiles', top=25):
+        self.trigger_file = trigger_file
+        self.output_dir = output_dir
+        self.top = top
+        self._requested = False
+        self.report = None
+        if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda *_: self.request())
+
+    def request(self):
+        self._requested = True
+
+    def _take_request(self):
+        if self.trigger_file and os.path.exists(self.trigger_file):
+            os.remove(self.trigger_file)
+            self._requested = True
+        requested, self._requested = self._requested, False
+        return requested
+
+    @contextmanager
+    def cycle(self):
+        """Wrap one cycle in this; profiles it only if a profile was requested."""
+        self.report = None
+        if not self._take_request():
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"cycle-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+            profiler.dump_stats(path)
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(self.top)
+            self.report = f"Saved cycle profile to '{path}'\n{text.getvalue()}"
@@ -0,0 +1,241 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import METRICS
+
+_CLOSE = object() # Queued by close() to wake the dispatcher thread
+
+def group_by_story(alerts):
+    """Splits alerts into lists of near-duplicates, in order of each story's first alert."""
+    stories = {}
+    for alert in alerts:
+        key = alert.get('story')
+        stories.setdefault(key if key is not None else id(alert), []).append(alert)
+    return list(stories.values())
+
+
+def format_digest(alerts):
+    """Builds the (subject, body) of one notification covering every alert in the batch.
+
+    Alerts for the same story are listed once, with the other sites under "Also reported by".
+    An alert whose story an earlier digest already covered says so.
+    """
+    current_time_str = time.strftime("%Y-%m-%d %H:%M:%S")
+    subject = "News Monitor Alert: New Relevant Articles Found!"
+    body = f"Found the following new articles matching your keywords ({current_time_str}):\n\n"
+    for first, *others in group_by_story(alerts):
+        keywords = list(dict.fromkeys(keyword for alert in (first, *others) for keyword in alert['keywords']))
+        body += f"- {first['headline']}\n  Link: {first['link']}\n"
+        body += f"  Source: {first['site']}\n  Matched Keywords: {', '.join(keywords)}\n"
+        if first.get('earlier'):
+            body += f"  Same story as an earlier alert: {first['earlier']['site']} - {first['earlier']['headline']}\n"
+        for other in others:
+            body += f"  Also reported by: {other['site']} - {other['headline']} ({other['link']})\n"
+        body += "\n"
+    return subject, body
+
+
+class SmtpSink:
+    """Delivers digests by email over one long-lived, authenticated SMTP connection.
+
+    smtplib and the email package are imported on the first send, so monitors
+    running without email never load them.
+    """
+
+    def __init__(self, server, port, username, password, sender, recipient, timeout=30):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.recipient = recipient
+        self.timeout = timeout
+        self._smtp = None
+
+    def _connect(self):
+        import smtplib
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            smtp.starttls()
+            smtp.login(self.username, self.password)
+        except BaseException:
+            smtp.close() # Otherwise every failed attempt leaks its socket
+            raise
+        self._smtp = smtp
+
+    def _connection(self):
+        import smtplib
+        # Servers drop idle connections, so check the kept one is still usable first
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+        self._connect()
+        return self._smtp
+
+    def send(self, subject, body):
+        import smtplib
+        from email.mime.text import MIMEText
+        msg = MIMEText(body, _charset='utf-8')
+        msg['Subject'] = subject
+        msg['From'] = self.sender
+        msg['To'] = self.recipient
+        try:
+            self._connection().sendmail(self.sender, self.recipient, msg.as_string().encode('utf-8'))
+        except (smtplib.SMTPServerDisconnected, OSError):
+            self.close() # reconnect on the next attempt
+            raise
+
+    def close(self):
+        if self._smtp is not None:
+            import smtplib
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    def __repr__(self):
+        return f"SmtpSink({self.server}:{self.port})"
+
+
+class FileSink:
+    """Appends digests to a local file; a stand-in for SMTP when testing or running without email."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, subject, body):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(f"Subject: {subject}\n\n{body}\n")
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return f"FileSink({self.path})"
+
+
+class NotificationDispatcher:
+    """Delivers alerts from a background thread so fetching never waits on a mail server.
+
+    submit() only enqueues. The dispatcher thread waits for the first alert, keeps
+    collecting for `batch_window` seconds (or until `max_batch` alerts), and sends the
+    whole batch as one digest to every sink. A failing sink is retried with exponential
+    backoff, up to `max_retries` attempts, before the digest is dropped for that sink.
+
+    Alerts carrying a `story` id are near-duplicates of each other (see StoryIndex): the
+    ones in the same batch share one digest entry. Later ones for a story an earlier
+    digest covered are still sent, never dropped (their links are already marked as
+    seen), and point to the story's first alert; the first alerts of the last
+    `max_sent_stories` stories are remembered for that.
+    """
+
+    def __init__(self, sinks, batch_window=60, max_batch=100, max_retries=5, retry_delay=2, log=print,
+                 max_sent_stories=10000):
+        self.sinks = list(sinks)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.log = log
+        self.max_sent_stories = max_sent_stories
+        self.stats = {'submitted': 0, 'digests': 0, 'delivered': 0, 'retries': 0, 'failed': 0, 'follow_ups': 0}
+        self._sent_stories = OrderedDict() # story id -> its first sent alert, most recently sent last
+        self._queue = queue.Queue()
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='notify', daemon=True)
+        self._thread.start()
+
+    def submit(self, site, headline, link, keywords, description='', story=None):
+        """Queues one alert for delivery; never blocks."""
+        if not self.sinks:
+            return
+        self.stats['submitted'] += 1
+        self._queue.put({'site': site, 'headline': headline, 'link': link,
+                         'keywords': keywords, 'description': description, 'story': story})
+
+    def _next_batch(self):
+        try:
+            first = self._queue.get(timeout=1)
+        except queue.Empty:
+            return []
+        if first is _CLOSE:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if self._closing.is_set():
+                remaining = 0 # flush whatever is already queued
+            try:
+                alert = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if alert is _CLOSE:
+                break # Send what was collected right away; anything left is drained by _run
+            batch.append(alert)
+        return batch
+
+    def _deliver(self, sink, subject, body):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                with METRICS.timer('notify_seconds', sink=type(sink).__name__):
+                    sink.send(subject, body)
+                self.stats['delivered'] += 1
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.stats['failed'] += 1
+                    self.log(f"Failed to send notification via {sink!r} after {attempt} attempts: {e}")
+                    return
+                delay = self.retry_delay * 2 ** (attempt - 1)
+                self.stats['retries'] += 1
+                self.log(f"Notification via {sink!r} failed ({e}), retrying in {delay}s...")
+                # Stop waiting between attempts once we are shutting down
+                self._closing.wait(delay)
+
+    def _link_sent_stories(self, batch):
+        """Points alerts for stories an earlier digest covered to that story's first alert."""
+        for first, *others in group_by_story(batch):
+            story = first.get('story')
+            if story is None:
+                continue
+            earlier = self._sent_stories.get(story)
+            if earlier is None:
+                self._sent_stories[story] = {'site': first['site'], 'headline': first['headline']}
+            else:
+                first['earlier'] = earlier
+                self.stats['follow_ups'] += 1 + len(others)
+            self._sent_stories.move_to_end(story)
+        while len(self._sent_stories) > self.max_sent_stories:
+            self._sent_stories.popitem(last=False)
+        return batch
+
+    def _run(self):
+        while not (self._closing.is_set() and self._queue.empty()):
+            batch = self._link_sent_stories(self._next_batch())
+            if not batch:
+                continue
+            subject, body = format_digest(batch)
+            self.stats['digests'] += 1
+            for sink in self.sinks:
+                self._deliver(sink, subject, body)
+            self.log(f"Sent notification digest with {len(batch)} article(s).")
+
+    def close(self, timeout=None):
+        """Flushes queued alerts, then closes every sink.
+
+        Waits for the flush by default: the alerts' links are already marked as seen,
+        so an alert abandoned here would never be sent.
+        """
+        self._closing.set()
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout)
+        for sink in self.sinks:
+            sink.close()
@@ -0,0 +1,226 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from http_cache import NOT_MODIFIED
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class StageStats:
+    """Queue depth and latency bookkeeping for one pipeline stage (thread-safe).
+
+    A stage whose jobs run in other processes cannot tell when one starts
+    (`tracks_start=False`): its queued and running jobs are reported together as
+    'pending', without an 'active' count.
+    """
+
+    def __init__(self, window=1000, tracks_start=True):
+        self._lock = threading.Lock()
+        self.tracks_start = tracks_start
+        self.queued = 0 # jobs waiting to start (or, without tracks_start, to finish)
+        self.active = 0 # jobs currently running
+        self.peak_queued = 0
+        self.completed = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window) # seconds spent running, most recent jobs
+        self.waits = deque(maxlen=window) # seconds spent queued before running
+
+    def enqueue(self):
+        with self._lock:
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+
+    def start(self):
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+
+    def finish(self, wait, latency, error=False):
+        with self._lock:
+            if self.tracks_start:
+                self.active -= 1
+            else:
+                self.queued -= 1
+            self.completed += 1
+            self.errors += int(error)
+            self.waits.append(wait)
+            self.latencies.append(latency)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = list(self.latencies)
+            waits = list(self.waits)
+            if self.tracks_start:
+                depth = {'queued': self.queued, 'active': self.active, 'peak_queued': self.peak_queued}
+            else:
+                depth = {'pending': self.queued, 'peak_pending': self.peak_queued}
+            return {
+                **depth,
+                'completed': self.completed,
+                'errors': self.errors,
+                'latency_p50': percentile(latencies, 0.5),
+                'latency_p95': percentile(latencies, 0.95),
+                'latency_max': max(latencies, default=0.0),
+                'wait_p95': percentile(waits, 0.95),
+            }
+
+
+def _timed_call(fn, *args):
+    # Runs inside a worker process; returns how long the call itself took
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+class Pipeline:
+    """Splits each site check into an I/O-bound fetch stage and a CPU-bound parse/match stage.
+
+    Fetches run on the FetchPool threads. Their raw payloads are handed to a
+    ProcessPoolExecutor, so parsing never holds the GIL the fetch threads need. At
+    most `max_pending_parses` payloads wait for or sit in the parse stage at a time:
+    once that bound is reached fetch threads block before submitting more, which
+    keeps memory bounded when parsing falls behind. Pass a 'forkserver' or 'spawn'
+    `mp_context` when the caller already runs threads: a plain fork copies their locks
+    in whatever state they are, and the pool is also restarted at any time (below).
+
+    A worker process that dies (OOM kill, a crash in lxml) breaks the whole process
+    pool and fails every parse in it. The pool is then replaced, and each lost parse
+    is retried in a worker process of its own, up to `parse_attempts` attempts in all,
+    so a page that keeps crashing its worker only fails its own site.
+    """
+
+    def __init__(self, fetch_pool, parse_workers=None, max_pending_parses=16, initializer=None, initargs=(),
+                 parse_attempts=2, mp_context=None):
+        self.fetch_pool = fetch_pool
+        self.parse_workers = parse_workers
+        self.mp_context = mp_context
+        self.parse_attempts = parse_attempts
+        self.pool_restarts = 0
+        self._initializer = initializer
+        self._initargs = initargs
+        self._executor_lock = threading.Lock()
+        self._parse_executor = self._new_executor()
+        self._parse_slots = threading.BoundedSemaphore(max_pending_parses)
+        self.fetch_stats = StageStats()
+        self.parse_stats = StageStats(tracks_start=False) # Workers do not report when they pick a job up
+
+    def _new_executor(self, max_workers=None):
+        return ProcessPoolExecutor(max_workers=max_workers or self.parse_workers, mp_context=self.mp_context,
+                                   initializer=self._initializer, initargs=self._initargs)
+
+    def _replace_broken(self, executor):
+        """Swaps in a fresh process pool for `executor`, unless another thread already did."""
+        with self._executor_lock:
+            if self._parse_executor is not executor:
+                return
+            self._parse_executor = self._new_executor()
+            self.pool_restarts += 1
+        executor.shutdown(wait=False)
+
+    def start(self):
+        """Starts the worker processes up front, so the first cycle does not wait for them."""
+        self._parse_executor.submit(time.sleep, 0).result()
+
+    def _fetch_stage(self, job, fetch, parse, results, enqueued):
+        started = time.monotonic()
+        self.fetch_stats.start()
+        try:
+            fetched = fetch(job)
+        except Exception as e:
+            self.fetch_stats.finish(started - enqueued, time.monotonic() - started, error=True)
+            results.put((job, None, e))
+            return
+        self.fetch_stats.finish(started - enqueued, time.monotonic() - started)
+
+        # Failed or unchanged fetches have nothing to parse
+        if fetched is None or fetched is NOT_MODIFIED:
+            results.put((job, fetched, None))
+            return
+
+        self.parse_stats.enqueue()
+        self._parse_slots.acquire() # Backpressure: wait here while the parse stage is full
+        self._submit_parse(job, fetched, parse, results, time.monotonic(), self.parse_attempts)
+
+    def _submit_parse(self, job, fetched, parse, results, submitted, attempts_left, isolated=False):
+        # An isolated parse gets a one-off pool with a single worker, shut down once it is done
+        executor = self._new_executor(max_workers=1) if isolated else self._parse_executor
+        try:
+            future = executor.submit(_timed_call, parse, job, fetched)
+        except BrokenProcessPool as e:
+            self._replace_broken(executor)
+            self._retry_or_fail(e, job, fetched, parse, results, submitted, attempts_left)
+            return
+        except Exception as e:
+            self._parse_failed(e, job, results, submitted)
+            return
+        future.add_done_callback(
+            lambda done: self._parse_done(done, executor, isolated, job, fetched, parse, results, submitted, attempts_left))
+
+    def _retry_or_fail(self, error, job, fetched, parse, results, submitted, attempts_left):
+        if attempts_left > 1:
+            # Retried alone: if this job is what killed the worker, it takes no other parse down with it
+            self._submit_parse(job, fetched, parse, results, submitted, attempts_left - 1, isolated=True)
+        else:
+            self._parse_failed(error, job, results, submitted)
+
+    def _parse_failed(self, error, job, results, submitted):
+        self._parse_slots.release()
+        self.parse_stats.finish(time.monotonic() - submitted, 0.0, error=True)
+        results.put((job, None, error))
+
+    def _parse_done(self, future, executor, isolated, job, fetched, parse, results, submitted, attempts_left):
+        if isolated:
+            executor.shutdown(wait=False)
+        try:
+            result, latency = future.result()
+        except BrokenProcessPool as e:
+            # A worker died; every parse still in that pool fails with this, not only the culprit's
+            self._replace_broken(executor)
+            self._retry_or_fail(e, job, fetched, parse, results, submitted, attempts_left)
+            return
+        except Exception as e:
+            self._parse_failed(e, job, results, submitted)
+            return
+        self._parse_slots.release()
+        total = time.monotonic() - submitted
+        self.parse_stats.finish(max(total - latency, 0.0), latency)
+        results.put((job, result, None))
+
+    def run(self, jobs, fetch, parse):
+        """Runs fetch(job) then parse(job, payload) for every job.
+
+        Yields (job, result, error) tuples in completion order. `result` is the parse
+        result, or the fetch result itself when that is None or NOT_MODIFIED. `parse`
+        must be a picklable top-level function since it runs in another process.
+        """
+        results = queue.Queue()
+        jobs = list(jobs)
+        for job in jobs:
+            self.fetch_stats.enqueue()
+            self.fetch_pool.submit(job['url'], self._fetch_stage, job, fetch, parse, results, time.monotonic())
+        for _ in jobs:
+            yield results.get()
+
+    def worker_pids(self):
+        """Process ids of the current parse workers."""
+        with self._executor_lock:
+            return list(self._parse_executor._processes or ())
+
+    def stats(self):
+        parse_stats = dict(self.parse_stats.snapshot(), pool_restarts=self.pool_restarts)
+        return {'fetch': self.fetch_stats.snapshot(), 'parse': parse_stats}
+
+    def shutdown(self, wait=True):
+        with self._executor_lock:
+            executor = self._parse_executor
+        executor.shutdown(wait=wait, cancel_futures=True)
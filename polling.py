@@ -0,0 +1,120 @@
+import heapq
+import itertools
+
+
+class SiteSchedule:
+    """Polling state the scheduler keeps for one site."""
+
+    def __init__(self, key, interval, min_interval, max_interval):
+        self.key = key
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.hint_interval = 0 # publisher's own refresh hint (feed ttl / Cache-Control max-age)
+        self.rate = None # smoothed new entries per second, None until observed
+        self.last_poll = None
+        self.next_due = 0.0
+        self.failures = 0
+
+
+class PollScheduler:
+    """Decides when each site is polled next, learning from how often it publishes.
+
+    Sites sit in a heap keyed on their next-due time. After every poll the site's
+    arrival rate is updated (an exponentially weighted average of new entries per
+    second) and its next interval is chosen so that roughly `target_new_per_poll`
+    entries arrive between polls, clamped to [min_interval, max_interval] and never
+    shorter than the publisher's ttl / max-age hint. Polls that find nothing stretch
+    the interval by `backoff`; failed polls back off exponentially.
+    """
+
+    def __init__(self, min_interval=300, max_interval=6 * 3600, initial_interval=3600,
+                 target_new_per_poll=1.0, smoothing=0.3, backoff=1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.target_new_per_poll = target_new_per_poll
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self.sites = {}
+        self._heap = []
+        self._order = itertools.count() # tie-breaker so equal due times pop in insertion order
+
+    def add(self, key, now=0.0, min_interval=None, max_interval=None):
+        """Registers a site, due immediately. Per-site bounds override the scheduler's defaults."""
+        site = SiteSchedule(
+            key,
+            self.initial_interval,
+            self.min_interval if min_interval is None else min_interval,
+            self.max_interval if max_interval is None else max_interval,
+        )
+        site.next_due = now
+        self.sites[key] = site
+        heapq.heappush(self._heap, (site.next_due, next(self._order), key))
+
+    def remove(self, key):
+        """Stops scheduling a site (e.g. another node owns it now); its heap entry is dropped lazily."""
+        self.sites.pop(key, None)
+
+    def _is_current(self, due, key):
+        # Heap entries of removed (or removed and re-added) sites are stale
+        site = self.sites.get(key)
+        return site is not None and site.next_due == due
+
+    def _drop_stale(self):
+        while self._heap and not self._is_current(self._heap[0][0], self._heap[0][2]):
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        """Time the earliest site becomes due, or None when nothing is scheduled."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Removes and returns the keys of every site due at `now`; report back with record()."""
+        due = []
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            due_at, _, key = heapq.heappop(self._heap)
+            if self._is_current(due_at, key):
+                due.append(key)
+            self._drop_stale()
+        return due
+
+    def _clamp(self, site, interval):
+        lower = max(site.min_interval, min(site.hint_interval, site.max_interval))
+        return min(max(interval, lower), site.max_interval)
+
+    def record(self, key, now, new_entries=None, failed=False, hint_seconds=None):
+        """Feeds the outcome of a poll back and reschedules the site.
+
+        `new_entries` is the number of entries that appeared since the previous poll, or
+        None when that is unknown (e.g. the very first poll, where everything looks new).
+        `hint_seconds` is the publisher's refresh hint, if it gave one.
+        """
+        site = self.sites[key]
+        if hint_seconds:
+            site.hint_interval = hint_seconds
+
+        if failed:
+            site.failures += 1
+            interval = site.interval * (2 ** site.failures)
+        else:
+            site.failures = 0
+            if new_entries is not None and site.last_poll is not None and now > site.last_poll:
+                observed = new_entries / (now - site.last_poll)
+                site.rate = observed if site.rate is None else (
+                    self.smoothing * observed + (1 - self.smoothing) * site.rate)
+            if new_entries == 0 and site.rate is not None:
+                # Quiet poll: stretch gradually rather than jumping straight to the max
+                interval = min(site.interval * self.backoff, self.target_new_per_poll / site.rate if site.rate else site.max_interval)
+            elif site.rate:
+                interval = self.target_new_per_poll / site.rate
+            else:
+                interval = site.interval
+            site.interval = self._clamp(site, interval)
+            site.last_poll = now
+
+        site.next_due = now + self._clamp(site, interval)
+        heapq.heappush(self._heap, (site.next_due, next(self._order), key))
+        return site.next_due
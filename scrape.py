@@ -5,86 +5,66 @@ import time
 
 # --- Selenium Imports ---
 from seleniumbase import Driver
+from selenium.common.exceptions import WebDriverException
+from browser_pool import BrowserPool
+from snapshot_store import SnapshotStore
+from charset import CharsetResolver
+
+# One undetected-chrome browser is reused for every site instead of launching one per URL
+BROWSER_POOL = BrowserPool(lambda: Driver(uc=True), size=1, max_pages=20)
+
+# Fetched pages are kept compressed under html/objects/ (read them back with zcat)
+SNAPSHOTS = SnapshotStore('html', max_per_site=5)
+
+CHARSETS = CharsetResolver()
+
+def save_snapshot(site_name, body):
+    """Queues a compressed copy of a fetched page for inspection."""
+    digest, changed = SNAPSHOTS.record(site_name, body)
+    # Nothing parses these pages later, so the saved copy is what the next run compares against
+    SNAPSHOTS.accept(site_name)
+    if changed:
+        print(f"Saving fetched HTML source to '{SNAPSHOTS.object_path(digest)}'")
+    else:
+        print(f"Fetched HTML is unchanged since '{SNAPSHOTS.object_path(digest)}'")
 
 def fetch_html_with_selenium(url, site_name):
-    """Fetches dynamically loaded HTML content from a given URL using Selenium."""
-    driver = None # Initialize driver to None
+    """Fetches dynamically loaded HTML content from a given URL using a pooled SeleniumBase browser."""
     html_content = None # Initialize html_content
-    # Define a filename for saving the source code
-    source_filename = f"html/{site_name}_source_sel.html"
     try:
-        # Setup Chrome options (headless recommended for background execution)
-        # options = uc.ChromeOptions()
-        # options.binary_location = "/usr/bin/chromium"
-        # options.add_argument("--headless")  # Run in headless mode
-        # options.add_argument("--disable-gpu")
-        # options.add_argument("--no-sandbox")
-        # options.add_argument("--window-size=1920,1080")
-        # options.add_argument("--disable-blink-features=AutomationControlled")
-        # options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36")
+        with BROWSER_POOL.driver() as driver:
+            print(f"Loading URL with SeleniumBase: {url}")
+            driver.uc_open_with_reconnect(url,4)
 
-        # Initialize WebDriver (assuming chromedriver is in PATH)
-        # If not in PATH, use: driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver = Driver(uc=True)
-        #driver.implicitly_wait(5) # Basic implicit wait
+            #time.sleep(15)
 
-        print(f"Loading URL with SeleniumBase: {url}")
-        driver.uc_open_with_reconnect(url,4)
-
-        #time.sleep(15)
-
-        # Get the page source *after* JavaScript has potentially run
-        html_content = driver.page_source
+            # Get the page source *after* JavaScript has potentially run
+            html_content = driver.page_source
         print(f"Successfully fetched HTML for {url}")
 
         # --- Save the fetched HTML for debugging ---
-        try:
-            with open(source_filename, "w", encoding="utf-8") as f:
-                f.write(html_content)
-            print(f"Saved fetched HTML source to '{source_filename}'")
-        except Exception as save_e:
-            print(f"Could not save HTML source to file: {save_e}")
-        # --- End Save HTML ---
+        save_snapshot(f"{site_name} (selenium)", html_content)
         return html_content
 
-    except TimeoutException:
-        print(f"Error: Timed out waiting for element '{wait_selector_str}' on {url}. Page might not have loaded correctly or selector is wrong.")
-        # Try to get and save page source even on timeout for debugging
-        if driver:
-             try:
-                 html_content = driver.page_source
-                 with open(source_filename, "w", encoding="utf-8") as f:
-                     f.write(html_content if html_content else "")
-                 print(f"Saved HTML source (on timeout) to '{source_filename}' - PLEASE INSPECT THIS FILE.")
-                 return html_content # Return potentially incomplete HTML
-             except Exception as save_e:
-                 print(f"Could not save HTML source to file after timeout: {save_e}")
-        return None # Indicate failure
     except WebDriverException as e:
         print(f"Error during Selenium fetch for {url}: {e}")
         return None
     except Exception as e:
         print(f"An unexpected error occurred during Selenium fetch for {url}: {e}")
         return None
-    finally:
-        # Ensure the browser is closed even if errors occur
-        if driver:
-            print("Closing Selenium browser.")
-            driver.quit()
 
 def fetch_html_without_selenium(url, site_name):
      """Fetches HTML content from a given URL."""
-     source_filename = f"html/{site_name}_source.html"
      try:
          # Send an HTTP GET request to the URL
          # Include a User-Agent header to mimic a browser visit
          headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
          response = requests.get(url, headers=headers, timeout=10) # Added timeout
-         response.encoding = 'gbk'
-         #response.encoding = 'gb2312'
          response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
-         with open(source_filename,'w') as f:
-             f.write(response.text)
+         # BOM, header or <meta> charset, else detection on the first 64 KB (not the whole page)
+         response.encoding, source = CHARSETS.resolve(site_name, response.content, response.headers)
+         print(f"Decoding {site_name} as {response.encoding} ({source})")
+         save_snapshot(site_name, response.content)
          return response.text
      except requests.exceptions.RequestException as e:
          print(f"Error fetching {url}: {e}")
@@ -102,10 +82,17 @@ except json.JSONDecodeError:
 except Exception as e:
     print("Error: {e}")
 
-for website in NEWS_WEBSITES:
-    if website['rss'] != 1:
-        print(f"Trying to fetch for {website['name']}")
-        print("Fetching only using requests")
-        fetch_html_without_selenium(website['url'],website['name'])
-        print("Fetching with selenium")
-        fetch_html_with_selenium(website['url'],website['name'])
+try:
+    for website in NEWS_WEBSITES:
+        if website['rss'] != 1:
+            print(f"Trying to fetch for {website['name']}")
+            print("Fetching only using requests")
+            fetch_html_without_selenium(website['url'],website['name'])
+            print("Fetching with selenium")
+            fetch_html_with_selenium(website['url'],website['name'])
+finally:
+    for driver_stats in BROWSER_POOL.stats()['drivers']:
+        print(f"Browser {driver_stats['id']}: {driver_stats['pages']} pages, {driver_stats['errors']} errors, {driver_stats['busy_seconds']}s busy")
+    print("Closing Selenium browser.")
+    BROWSER_POOL.close()
+    SNAPSHOTS.close()
@@ -0,0 +1,138 @@
+import hashlib
+import math
+import sqlite3
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Query parameters that only identify where a click came from, not which article it is
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    'ref', 'ref_src', 'cmpid', 'ocid', 'smid', 'spm', '_ga', 'guccounter',
+}
+TRACKING_PREFIXES = ('utm_', 'itm_', 'pk_')
+
+
+def normalize_url(url):
+    """Reduces a link to a stable key so the same story under different query strings dedups.
+
+    Drops the scheme, a leading "www.", default ports, the fragment, trailing slashes
+    and tracking parameters, and sorts whatever query parameters remain.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip('/') or '/'
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    key = host + path
+    if query:
+        key += '?' + urlencode(query)
+    return key
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter; answers "definitely not seen" without touching disk."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(capacity, 1)
+        self.num_bits = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.num_bits / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: derive every bit position from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class SeenStore:
+    """Disk-backed set of already alerted article links, kept in SQLite.
+
+    Links are stored under their normalized key. Entries older than `max_age_days`
+    or beyond the newest `max_items` are evicted by evict(). An optional in-memory
+    Bloom filter sits in front of the table so add() answers links this process already
+    recorded with a read instead of a write. Whether a link is new is always decided by
+    the table, which other monitor nodes may have written to, never by the filter alone.
+    """
+
+    def __init__(self, path='seen_articles.db', max_age_days=30, max_items=100000, use_bloom=True):
+        self.path = path
+        self.max_age_seconds = max_age_days * 86400 if max_age_days else None
+        self.max_items = max_items
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS seen ('
+            ' key TEXT PRIMARY KEY,'
+            ' link TEXT NOT NULL,'
+            ' first_seen REAL NOT NULL'
+            ') WITHOUT ROWID'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS seen_first_seen ON seen (first_seen)')
+        self.use_bloom = use_bloom
+        self.bloom = None
+        if use_bloom:
+            self._rebuild_bloom()
+
+    def _rebuild_bloom(self):
+        self.bloom = BloomFilter(max(self.max_items or 0, len(self) * 2, 1024))
+        for (key,) in self.conn.execute('SELECT key FROM seen'):
+            self.bloom.add(key)
+
+    def _on_disk(self, key):
+        return self.conn.execute('SELECT 1 FROM seen WHERE key = ?', (key,)).fetchone() is not None
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def add(self, link):
+        """Records `link` as seen. Returns True if it was not seen before."""
+        key = normalize_url(link)
+        if self.bloom is not None and key in self.bloom and self._on_disk(key):
+            return False
+        cursor = self.conn.execute(
+            'INSERT OR IGNORE INTO seen (key, link, first_seen) VALUES (?, ?, ?)',
+            (key, link, time.time()),
+        )
+        if self.bloom is not None:
+            self.bloom.add(key)
+        return cursor.rowcount == 1
+
+    def evict(self):
+        """Drops expired entries and trims the store to `max_items`. Returns the number removed."""
+        removed = 0
+        if self.max_age_seconds:
+            cutoff = time.time() - self.max_age_seconds
+            removed += self.conn.execute('DELETE FROM seen WHERE first_seen < ?', (cutoff,)).rowcount
+        if self.max_items:
+            removed += self.conn.execute(
+                'DELETE FROM seen WHERE key IN ('
+                ' SELECT key FROM seen ORDER BY first_seen DESC LIMIT -1 OFFSET ?'
+                ')',
+                (self.max_items,),
+            ).rowcount
+        # Evicted keys stay in the filter as harmless false positives; only rebuild it once
+        # it has absorbed more keys than it was sized for
+        if self.bloom is not None and self.bloom.count > self.bloom.capacity:
+            self._rebuild_bloom()
+        return removed
+
+    def close(self):
+        self.conn.close()
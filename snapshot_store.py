@@ -0,0 +1,215 @@
+import gzip
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+
+class SnapshotStore:
+    """Compressed, content-addressed history of fetched page bodies.
+
+    Every body is hashed (sha256) on the fetch thread and compared with the last
+    snapshot of the same site that was parsed successfully (marked with accept());
+    record() reports whether it changed, so identical pages can skip parsing, while a
+    page whose parse failed is parsed again next time. New bodies are gzip-compressed and written by a background
+    thread to `root/objects/<2 hex>/<digest>.gz`, so a body shared by several sites or
+    snapshots is stored once. An SQLite index in `root/index.db` keeps the snapshot
+    history. After each write, snapshots beyond `max_per_site` per site, older than
+    `max_age_days`, or beyond `max_bytes` of compressed data in total are dropped
+    (oldest first, never a site's latest one), along with objects nothing refers to.
+
+    Nothing is opened and no thread is started until the first record(), so creating
+    a store before the parse workers are forked is safe.
+    """
+
+    def __init__(self, root='snapshots', max_per_site=10, max_age_days=7, max_bytes=200 * 1024 * 1024, compresslevel=6):
+        self.root = root
+        self.max_per_site = max_per_site
+        self.max_age_seconds = max_age_days * 86400 if max_age_days else None
+        self.max_bytes = max_bytes
+        self.compresslevel = compresslevel
+        self.stats = {'unchanged': 0, 'written': 0, 'bytes_raw': 0, 'bytes_stored': 0, 'pruned': 0, 'errors': 0}
+        self._lock = threading.Lock()
+        self._latest = None # site -> digest of its newest snapshot, loaded on first use
+        self._parsed = None # site -> digest of its newest snapshot that was parsed
+        self._queue = queue.Queue()
+        self._thread = None
+
+    @property
+    def index_path(self):
+        return os.path.join(self.root, 'index.db')
+
+    def object_path(self, digest):
+        """Where the compressed body with this digest is (or will be) stored."""
+        return os.path.join(self.root, 'objects', digest[:2], f"{digest}.gz")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS snapshots ('
+            ' site TEXT NOT NULL,'
+            ' digest TEXT NOT NULL,'
+            ' fetched_at REAL NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' stored_size INTEGER NOT NULL,'
+            ' parsed INTEGER NOT NULL DEFAULT 0'
+            ')'
+        )
+        if 'parsed' not in {row[1] for row in conn.execute('PRAGMA table_info(snapshots)')}:
+            # Indexes from before parse tracking: their snapshots were all parsed
+            conn.execute('ALTER TABLE snapshots ADD COLUMN parsed INTEGER NOT NULL DEFAULT 1')
+        conn.execute('CREATE INDEX IF NOT EXISTS snapshots_site ON snapshots (site, fetched_at)')
+        return conn
+
+    def _start(self):
+        # Called with the lock held
+        os.makedirs(os.path.join(self.root, 'objects'), exist_ok=True)
+        conn = self._connect()
+        try:
+            self._latest = dict(conn.execute(
+                'SELECT site, digest FROM snapshots s WHERE fetched_at = '
+                ' (SELECT MAX(fetched_at) FROM snapshots WHERE site = s.site)'
+            ).fetchall())
+            self._parsed = dict(conn.execute(
+                'SELECT site, digest FROM snapshots s WHERE parsed AND fetched_at = '
+                ' (SELECT MAX(fetched_at) FROM snapshots WHERE site = s.site AND parsed)'
+            ).fetchall())
+        finally:
+            conn.close()
+        self._thread = threading.Thread(target=self._run, name='snapshots', daemon=True)
+        self._thread.start()
+
+    def record(self, site, body):
+        """Snapshots `body` (bytes or str) for `site`.
+
+        Returns (digest, changed). `changed` is False when the body is identical to the
+        site's last parsed snapshot. A body identical to the newest snapshot is not
+        written again. Never blocks on disk.
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            if self._thread is None:
+                self._start()
+            if self._parsed.get(site) == digest:
+                self.stats['unchanged'] += 1
+                return digest, False
+            new = self._latest.get(site) != digest
+            self._latest[site] = digest
+        if new:
+            self._queue.put(('write', site, digest, body, time.time()))
+        return digest, True
+
+    def accept(self, site):
+        """Marks the newest snapshot of `site` as parsed: an identical body is unchanged from now on."""
+        with self._lock:
+            if self._thread is None:
+                self._start()
+            digest = self._latest.get(site)
+            if digest is None or self._parsed.get(site) == digest:
+                return
+            self._parsed[site] = digest
+        self._queue.put(('parsed', site, digest))
+
+    def _write_object(self, digest, body):
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            return os.path.getsize(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(gzip.compress(body, compresslevel=self.compresslevel, mtime=0))
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def _prune(self, conn):
+        removed = 0
+        if self.max_per_site:
+            removed += conn.execute(
+                'DELETE FROM snapshots WHERE rowid IN ('
+                ' SELECT rowid FROM ('
+                '  SELECT rowid, ROW_NUMBER() OVER (PARTITION BY site ORDER BY fetched_at DESC) AS age FROM snapshots'
+                ' ) WHERE age > ?'
+                ')',
+                (self.max_per_site,),
+            ).rowcount
+        # Age and size limits never remove a site's latest snapshot
+        not_latest = (
+            'rowid NOT IN (SELECT rowid FROM snapshots s WHERE fetched_at = '
+            ' (SELECT MAX(fetched_at) FROM snapshots WHERE site = s.site))'
+        )
+        if self.max_age_seconds:
+            removed += conn.execute(
+                f'DELETE FROM snapshots WHERE fetched_at < ? AND {not_latest}',
+                (time.time() - self.max_age_seconds,),
+            ).rowcount
+        if self.max_bytes:
+            # Each object counts once however many snapshots share it
+            total = conn.execute('SELECT COALESCE(SUM(stored_size), 0) FROM (SELECT DISTINCT digest, stored_size FROM snapshots)').fetchone()[0]
+            if total > self.max_bytes:
+                for rowid, digest, stored_size in conn.execute(
+                    f'SELECT rowid, digest, stored_size FROM snapshots WHERE {not_latest} ORDER BY fetched_at'
+                ).fetchall():
+                    conn.execute('DELETE FROM snapshots WHERE rowid = ?', (rowid,))
+                    removed += 1
+                    if conn.execute('SELECT 1 FROM snapshots WHERE digest = ?', (digest,)).fetchone() is None:
+                        total -= stored_size
+                    if total <= self.max_bytes:
+                        break
+        if removed:
+            self._collect_garbage(conn)
+        return removed
+
+    def _collect_garbage(self, conn):
+        referenced = {digest for (digest,) in conn.execute('SELECT DISTINCT digest FROM snapshots')}
+        objects_dir = os.path.join(self.root, 'objects')
+        for prefix in os.listdir(objects_dir):
+            prefix_dir = os.path.join(objects_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if name.endswith('.gz') and name[:-3] not in referenced:
+                    os.remove(os.path.join(prefix_dir, name))
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                if item[0] == 'parsed':
+                    _, site, digest = item
+                    try:
+                        conn.execute('UPDATE snapshots SET parsed = 1 WHERE site = ? AND digest = ?', (site, digest))
+                    except sqlite3.Error:
+                        with self._lock:
+                            self.stats['errors'] += 1
+                    continue
+                _, site, digest, body, fetched_at = item
+                try:
+                    stored_size = self._write_object(digest, body)
+                    conn.execute(
+                        'INSERT INTO snapshots (site, digest, fetched_at, size, stored_size) VALUES (?, ?, ?, ?, ?)',
+                        (site, digest, fetched_at, len(body), stored_size),
+                    )
+                    pruned = self._prune(conn)
+                except (OSError, sqlite3.Error):
+                    with self._lock:
+                        self.stats['errors'] += 1
+                    continue
+                with self._lock:
+                    self.stats['written'] += 1
+                    self.stats['bytes_raw'] += len(body)
+                    self.stats['bytes_stored'] += stored_size
+                    self.stats['pruned'] += pruned
+        finally:
+            conn.close()
+
+    def close(self, timeout=30):
+        """Finishes the queued writes and stops the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
@@ -0,0 +1,203 @@
+import itertools
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from matcher import is_cjk, normalize_text
+
+SHINGLE_SIZE = 4 # Characters per shingle, so it works for CJK text too, which has no spaces
+CJK_SHINGLE_SIZE = 2 # One CJK character carries about as much as a short Latin word
+DESCRIPTION_CHARS = 300 # Only the start of a description counts, the rest is often boilerplate
+MIN_DESCRIPTION_CHARS = 20 # Shorter descriptions ("N/A", a bare source name) are treated as missing
+EMPTY_SLOT = 0xFFFFFFFF
+
+_TAG_RE = re.compile(r'<[^>]*>')
+_NON_WORD_RE = re.compile(r'[\W_]+')
+
+
+def story_text(text, max_chars=None):
+    """Normalized text stories are compared on: tags, punctuation and case folded away."""
+    text = normalize_text(_TAG_RE.sub(' ', text or '')[:max_chars])
+    return _NON_WORD_RE.sub(' ', text).strip()
+
+
+def shingles(text, size=None):
+    if size is None:
+        mostly_cjk = sum(map(is_cjk, text)) * 2 > len(text)
+        size = CJK_SHINGLE_SIZE if mostly_cjk else SHINGLE_SIZE
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[start:start + size] for start in range(len(text) - size + 1)}
+
+
+def minhash(text, num_perm=64):
+    """MinHash signature of the character shingles of `text`, as num_perm 32-bit values.
+
+    Uses one-permutation hashing: every shingle is hashed once, the low bits pick one of
+    the `num_perm` slots and the high bits compete for that slot's minimum, so the cost
+    does not grow with the signature length. Empty slots borrow from the next filled one
+    (rotation densification), which keeps short headlines comparable.
+    Python's str hash is salted per process, so signatures are only comparable within one.
+    """
+    slots = array('I', [EMPTY_SLOT]) * num_perm
+    mask = num_perm - 1
+    for shingle in shingles(text):
+        value = hash(shingle) & 0xFFFFFFFFFFFFFFFF
+        slot = value & mask
+        value >>= 32
+        if value < slots[slot]:
+            slots[slot] = value
+    if EMPTY_SLOT in slots and any(value != EMPTY_SLOT for value in slots):
+        filled = [index for index, value in enumerate(slots) if value != EMPTY_SLOT]
+        for index in range(num_perm):
+            if slots[index] == EMPTY_SLOT:
+                donor = next((slot for slot in filled if slot > index), filled[0])
+                distance = (donor - index) % num_perm
+                slots[index] = (slots[donor] + distance * 0x9E3779B1) & 0xFFFFFFFF
+    return slots
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+def jaccard(first, second):
+    """Exact Jaccard similarity of two shingle sets."""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+class StoryIndex:
+    """Groups near-duplicate articles (the same wire story on several sites) into stories.
+
+    Each article gets a MinHash signature over its normalized headline and the start of
+    its description. Signatures are split into `bands` bands; articles sharing any band
+    land in the same bucket, so a lookup only looks at those candidates instead of every
+    remembered article. A candidate makes the new article part of its story when it
+    comes from another site, their headlines' shingle sets overlap by at least
+    `threshold` (exact Jaccard) and, when both have a description, the start of their
+    descriptions by at least `description_threshold`. Templated headlines ("2025 Subaru
+    Outback Review, Pricing, and Specs") share most of their shingles, so a site's own
+    articles are never grouped and the description has to agree as well.
+
+    Kept in memory: the newest `max_items` articles from the last `max_age_days` days.
+    """
+
+    def __init__(self, threshold=0.7, description_threshold=0.5, num_perm=64, bands=16, max_items=20000,
+                 max_age_days=7):
+        if num_perm & (num_perm - 1) or num_perm % bands:
+            raise ValueError("num_perm must be a power of two and a multiple of bands")
+        self.threshold = threshold
+        self.description_threshold = description_threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_items = max_items
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # item id -> (signature, story id, added_at, site, headline text, description text), oldest first
+        self._items = OrderedDict()
+        self._buckets = {} # band key -> item id, or a list of item ids once shared
+        self.stats = {'added': 0, 'collapsed': 0, 'evicted': 0, 'candidates': 0}
+
+    def __len__(self):
+        return len(self._items)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [hash((band, signature[band * rows:(band + 1) * rows].tobytes())) for band in range(self.bands)]
+
+    def _candidates(self, keys):
+        found = set()
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            if isinstance(bucket, list):
+                found.update(bucket)
+            else:
+                found.add(bucket)
+        return found
+
+    def _texts(self, headline, description):
+        headline = story_text(headline)
+        description = story_text(description, DESCRIPTION_CHARS)
+        return headline, description if len(description) >= MIN_DESCRIPTION_CHARS else ''
+
+    def _best_match(self, site, headline, description, keys):
+        best_story, best_score = None, 0.0
+        candidates = self._candidates(keys)
+        self.stats['candidates'] += len(candidates)
+        headline_shingles = shingles(headline)
+        description_shingles = shingles(description)
+        for item_id in candidates:
+            _, story_id, _, other_site, other_headline, other_description = self._items[item_id]
+            if site is not None and other_site == site:
+                continue
+            score = jaccard(headline_shingles, shingles(other_headline))
+            if score < self.threshold or score <= best_score:
+                continue
+            if description and other_description and \
+                    jaccard(description_shingles, shingles(other_description)) < self.description_threshold:
+                continue
+            best_story, best_score = story_id, score
+        return best_story, best_score
+
+    def find(self, headline, description='', site=None):
+        """Returns (story id, headline similarity) of the closest story from another site, or (None, 0.0)."""
+        headline, description = self._texts(headline, description)
+        signature = minhash(f"{headline} {description}", self.num_perm)
+        with self._lock:
+            return self._best_match(site, headline, description, self._band_keys(signature))
+
+    def add(self, site, headline, description='', now=None):
+        """Remembers an article of `site`; returns (story id, True if it starts a new story)."""
+        now = time.time() if now is None else now
+        headline, description = self._texts(headline, description)
+        signature = minhash(f"{headline} {description}", self.num_perm)
+        keys = self._band_keys(signature)
+        with self._lock:
+            story_id, _ = self._best_match(site, headline, description, keys)
+            is_new = story_id is None
+            item_id = next(self._ids)
+            if is_new:
+                story_id = item_id
+            else:
+                self.stats['collapsed'] += 1
+            self._items[item_id] = (signature, story_id, now, site, headline, description)
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    self._buckets[key] = item_id
+                elif isinstance(bucket, list):
+                    bucket.append(item_id)
+                else:
+                    self._buckets[key] = [bucket, item_id]
+            self.stats['added'] += 1
+            self._evict(now)
+        return story_id, is_new
+
+    def _remove(self, item_id):
+        signature = self._items.pop(item_id)[0]
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if isinstance(bucket, list):
+                bucket.remove(item_id)
+                if len(bucket) == 1:
+                    self._buckets[key] = bucket[0]
+            elif bucket == item_id:
+                del self._buckets[key]
+        self.stats['evicted'] += 1
+
+    def _evict(self, now):
+        cutoff = now - self.max_age
+        while self._items:
+            item_id, (_, _, added_at, *_) = next(iter(self._items.items()))
+            if len(self._items) <= self.max_items and added_at >= cutoff:
+                break
+            self._remove(item_id)
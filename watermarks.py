@@ -0,0 +1,100 @@
+import calendar
+import json
+import sqlite3
+import time
+
+# Entries published this long before the newest one we have seen may still be new: aggregators
+# such as Google News add stories late, so the timestamp alone is only trusted outside this window
+LATE_ARRIVAL_GRACE_SECONDS = 2 * 86400
+
+# Upper bound on the entry keys remembered per feed
+MAX_REMEMBERED_IDS = 1000
+
+
+def entry_key(entry):
+    """Stable identity of a feed entry: its guid/id, falling back to link, then title."""
+    return entry.get('id') or entry.get('link') or entry.get('title')
+
+
+def entry_timestamp(entry):
+    """Published (or updated) time of a feed entry as a UTC epoch, or None."""
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    return calendar.timegm(parsed) if parsed else None
+
+
+def _is_newest_first(timestamps):
+    # Undated entries (e.g. links scraped from a page) give no ordering guarantee
+    if len(timestamps) < 2 or None in timestamps:
+        return False
+    return all(earlier >= later for earlier, later in zip(timestamps, timestamps[1:]))
+
+
+def new_entries(entries, watermark, now=None):
+    """Splits off the entries of a feed (or any list of dicts with an id/link) newer than `watermark`.
+
+    A watermark is {'published': newest timestamp seen, 'ids': keys of the entries
+    evaluated so far}. An entry is old if its key was seen before, or if it is dated
+    well before the newest entry seen. Dates in the future are taken as `now`, so one
+    misdated entry cannot push every later one below the cut-off. On feeds ordered
+    newest-first, iteration stops at the first entry dated below the cut-off; seen
+    entries above it are skipped, since aggregators insert new ones between them.
+    Returns (new entries, watermark for the next cycle).
+    """
+    now = time.time() if now is None else now
+    timestamps = [min(timestamp, now) if timestamp is not None else None
+                  for timestamp in map(entry_timestamp, entries)]
+    seen_ids = set(watermark['ids']) if watermark else set()
+    newest_seen = watermark.get('published') if watermark else None
+    cutoff = newest_seen - LATE_ARRIVAL_GRACE_SECONDS if newest_seen is not None else None
+    stop_at_cutoff = cutoff is not None and _is_newest_first(timestamps)
+
+    fresh, evaluated = [], []
+    for entry, published in zip(entries, timestamps):
+        if stop_at_cutoff and published < cutoff:
+            break # Everything below is older still
+        evaluated.append((entry, published))
+        if entry_key(entry) in seen_ids or (cutoff is not None and published is not None and published < cutoff):
+            continue
+        fresh.append(entry)
+
+    known = [published for _, published in evaluated if published is not None]
+    if newest_seen is not None:
+        known.append(min(newest_seen, now))
+    # Keys evaluated this time first, then older ones in case an entry drops out and comes back
+    current_ids = [key for key in (entry_key(entry) for entry, _ in evaluated) if key]
+    current_set = set(current_ids)
+    remembered = current_ids + [key for key in (watermark['ids'] if watermark else []) if key not in current_set]
+    next_watermark = {
+        'published': max(known) if known else None,
+        'ids': remembered[:MAX_REMEMBERED_IDS],
+    }
+    return fresh, next_watermark
+
+
+class WatermarkStore:
+    """Per-feed watermarks persisted in SQLite so restarts resume where they left off."""
+
+    def __init__(self, path='feed_state.db'):
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS watermarks ('
+            ' feed_url TEXT PRIMARY KEY,'
+            ' watermark TEXT NOT NULL,'
+            ' updated_at REAL NOT NULL'
+            ')'
+        )
+
+    def get(self, feed_url):
+        row = self.conn.execute('SELECT watermark FROM watermarks WHERE feed_url = ?', (feed_url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, feed_url, watermark):
+        self.conn.execute(
+            'INSERT INTO watermarks (feed_url, watermark, updated_at) VALUES (?, ?, ?)'
+            ' ON CONFLICT(feed_url) DO UPDATE SET watermark = excluded.watermark, updated_at = excluded.updated_at',
+            (feed_url, json.dumps(watermark), time.time()),
+        )
+
+    def close(self):
+        self.conn.close()